@@ -1,8 +1,7 @@
 import streamlit as st
-import pandas as pd
-import folium
-from streamlit_folium import st_folium
-import numpy as np
+import uuid
+from pathlib import Path
+from diagnostics import DIAGNOSTICS_LOG_PATH, PhaseTimer, finish_profiler, start_profiler
 
 
 # Set page config
@@ -76,44 +75,177 @@ st.title("Store Map Dashboard")
 # Display columns for data table
 DISPLAY_COLUMNS = ['storename', 'value_2024', 'absolute_value_change', 'value_2025']
 DISPLAY_COLUMNS_DISPLAY_NAMES = ['Store', '2024 Value', 'Change in value', '2025 Value']
-INTEGER_COLUMNS = ['value_2024', 'value_2025', 'absolute_value_change', 'Area']
-FLOAT_COLUMNS = ['latitude', 'longitude', 'percentage_value_change']
-ENCODINGS_TO_TRY = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252', 'utf-16', 'utf-8-sig']
+BREAKDOWN_DIMENSIONS = {'Operator': 'operator_name', 'Entity': 'entity', 'Country': 'country',
+                        'City': 'city', 'Tenure': 'Tenure'}
+BREAKDOWN_CHART_GROUPS = 25
+MAP_ZOOM_START = 6
+STORE_SEARCH_LIMIT = 50
+# Example rows shown on the upload screen, kept as a ready-made Markdown table
+EXPECTED_FORMAT_PATH = Path(__file__).parent / 'assets' / 'expected_format.md'
 
 
 # Initialize session state
-if 'df' not in st.session_state:
-    st.session_state.df = None
+# Datasets live in a process-wide registry shared by all sessions; the
+# session only keeps the key of the dataset it is viewing
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'dataset_key' not in st.session_state:
+    st.session_state.dataset_key = None
 if 'file_uploaded' not in st.session_state:
     st.session_state.file_uploaded = False
+if 'merge_upload_round' not in st.session_state:
+    # Part of the merge uploader's key, so it starts empty after each merge
+    st.session_state.merge_upload_round = 0
+
+# Phase timings for this run, shown in the Diagnostics expander. Fragments
+# add their phases to the same timer. A cProfile capture only runs when one
+# was requested for this rerun
+timer = PhaseTimer()
+st.session_state.phase_timer = timer
+profiler = start_profiler() if st.session_state.pop('profile_next_run', False) else None
+
+# The upload screen only needs Streamlit. The data and map modules pull in
+# pandas, numpy, pyarrow and folium, which take about a second to import in
+# a fresh process, so they are imported once a file has been chosen or a
+# dataset is loaded
+if st.session_state.file_uploaded or st.session_state.get('csv_upload') is not None:
+    timer.start('import_modules')
+    import numpy as np
+    import folium
+    from streamlit_folium import st_folium
+    from data_loading import (REQUIRED_COLUMNS, STREAMING_MIN_BYTES, compact_column_types, convert_column_types,
+                              read_store_csv, stream_store_csv)
+    from dataset_store import registry as dataset_registry
+    from export import HAS_PYARROW, csv_bytes, parquet_bytes
+    from filter_engine import filter_signature
+    from map_layers import (AGGREGATE_BELOW_ZOOM, HEATMAP_WEIGHTS, SIGNED_HEATMAP_WEIGHTS, aggregate_stores,
+                            bin_layer, heatmap_layer, heatmap_points, is_high_volume, map_zoom, new_layer_cache,
+                            store_layer, viewport_query_bounds)
+    from rollup import scan_breakdown, summarize
+    from spatial_index import intersect_sorted
+    from table_view import TABLE_PAGE_SIZES, page_count, page_row_ids, sort_row_ids
+    from upload_cache import load_cached_upload, save_cached_upload, upload_cache_key
+    timer.stop('import_modules')
+    
+    if 'map_layer_cache' not in st.session_state:
+        st.session_state.map_layer_cache = new_layer_cache()
+
+def use_dataset(key, df=None):
+    # Attach this session to the shared dataset, registering df if no other
+    # session has loaded this file yet
+    if df is None:
+        dataset = dataset_registry.get(key, st.session_state.session_id)
+    else:
+        dataset = dataset_registry.register(key, df, st.session_state.session_id)
+    if dataset is not None:
+        st.session_state.dataset_key = key
+        st.session_state.file_uploaded = True
+    return dataset
+
+
+def merge_uploaded_files(uploaded_files):
+    # Merge each file into the session's dataset in upload order; the
+    # result is a new shared dataset, other sessions keep the data they had.
+    # The run always ends by clearing the uploader, also when a file fails,
+    # so the files are not read again on the next rerun
+    error = None
+    for position, uploaded in enumerate(uploaded_files):
+        raw = uploaded.getvalue()
+        if len(raw) >= STREAMING_MIN_BYTES:
+            delta, encoding, error_messages = stream_store_csv(raw)
+        else:
+            delta, encoding, error_messages = read_store_csv(raw)
+            if delta is not None:
+                delta = convert_column_types(delta)
+        if delta is None:
+            error = f"❌ Could not read {uploaded.name} with any supported encoding"
+            break
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in delta.columns]
+        if missing_columns:
+            error = f"❌ {uploaded.name} is missing required columns: {missing_columns}"
+            break
+        
+        dataset, counts = dataset_registry.upsert(st.session_state.dataset_key, upload_cache_key(raw), delta,
+                                                  st.session_state.session_id)
+        if dataset is None:
+            # The loaded data was unloaded meanwhile; the rerun reports it
+            break
+        st.session_state.dataset_key = dataset.key
+        st.toast(f"✅ {uploaded.name}: {counts['updated']} stores updated, {counts['added']} added, "
+                 f"{counts['unchanged']} unchanged")
+    
+    # Files after a failed one are not merged; the message is shown after the rerun
+    if error is not None:
+        skipped = uploaded_files[position + 1:]
+        if skipped:
+            error += f" - not merged: {', '.join(skipped_file.name for skipped_file in skipped)}"
+        st.session_state.merge_upload_error = error
+    st.session_state.merge_upload_round += 1
+    st.rerun()
+
+
+dataset = None
+if st.session_state.file_uploaded:
+    dataset = use_dataset(st.session_state.dataset_key)
+    if dataset is None:
+        # The registry drops datasets that no session has used for a while
+        st.session_state.dataset_key = None
+        st.session_state.file_uploaded = False
+        st.warning("Your data was unloaded after a period of inactivity. Please upload the file again.")
+
 
 # File uploader - only show if no data loaded
 if not st.session_state.file_uploaded:
-    uploaded_file = st.file_uploader("Upload your CSV file", type=['csv'])
+    uploaded_file = st.file_uploader("Upload your CSV file", type=['csv'], key="csv_upload")
+    compact_mode = st.checkbox(
+        "Compact in-memory storage",
+        value=True,
+        help="Store repeated text such as operators and countries as categories and use the smallest integer type for values and areas",
+        key="compact_mode"
+    )
     
     if uploaded_file is not None:
         st.toast(f"File uploaded: {uploaded_file.name}")
         
-        # Read the CSV file with multiple encoding attempts
+        # Read the CSV file - the encoding is picked from a sample of the bytes
+        # and the file is parsed once
         try:
               
-            df = None
-            error_messages = []
+            raw = uploaded_file.getvalue()
+            
+            # Reuse the converted data if this exact file is already open in
+            # another session or was processed before
+            cache_key = upload_cache_key(raw, compact=compact_mode)
+            if use_dataset(cache_key) is not None:
+                st.toast("✅ This file is already loaded, reusing it")
+                st.rerun()
             
-            # Try different encodings in order of likelihood
-            for encoding in ENCODINGS_TO_TRY:
-                try:
-                    # Reset file pointer for each attempt
-                    uploaded_file.seek(0)
-                    df = pd.read_csv(uploaded_file, encoding=encoding)
-                    st.success(f"✅ CSV loaded successfully with {encoding} encoding")
-                    break
-                except UnicodeDecodeError as e:
-                    error_messages.append(f"{encoding}: {str(e)[:100]}...")
-                    continue
-                except Exception as e:
-                    error_messages.append(f"{encoding}: {str(e)[:100]}...")
-                    continue
+            timer.start('load_cached_upload', csv_bytes=len(raw))
+            df = load_cached_upload(cache_key)
+            timer.stop('load_cached_upload', hit=df is not None)
+            if df is not None:
+                st.toast(f"✅ Loaded cached copy of this file: {len(df)} rows")
+                st.session_state.upload_timer = timer
+                use_dataset(cache_key, df)
+                st.rerun()
+            
+            # Large files are parsed in chunks that are converted, checked for
+            # a valid location and compacted as they arrive
+            streaming = len(raw) >= STREAMING_MIN_BYTES
+            timer.start('parse_csv', csv_bytes=len(raw), streaming=streaming)
+            if streaming:
+                progress = st.progress(0.0, text="Reading CSV...")
+                df, encoding, error_messages = stream_store_csv(
+                    raw,
+                    compact=compact_mode,
+                    on_progress=lambda fraction, rows: progress.progress(fraction, text=f"Reading CSV... {rows:,} stores")
+                )
+                progress.empty()
+            else:
+                df, encoding, error_messages = read_store_csv(raw)
+            timer.stop('parse_csv', rows_out=len(df) if df is not None else 0, encoding=encoding)
+            if df is not None:
+                st.success(f"✅ CSV loaded successfully with {encoding} encoding")
             
             if df is None:
                 st.error("❌ Could not read the CSV file with any supported encoding")
@@ -136,13 +268,12 @@ if not st.session_state.file_uploaded:
                 st.stop()
                 
             st.toast(f"CSV loaded: {len(df)} rows, {len(df.columns)} columns")
+            dropped_rows = df.attrs.get('dropped_rows')
+            if dropped_rows:
+                st.toast(f"⚠️ Skipped {dropped_rows} rows with missing latitude/longitude")
             
             # Verify required columns exist (updated to include entity)
-            required_columns = ['storename', 'operator_name', 'entity', 'country', 'city', 'latitude', 'longitude', 
-                              'value_2024', 'value_2025', 'absolute_value_change', 'percentage_value_change',
-                              'Tenure', 'Area']
-            
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
             if missing_columns:
                 st.error(f"❌ Missing required columns: {missing_columns}")
                 st.error("Please ensure your CSV contains all required columns.")
@@ -152,29 +283,22 @@ if not st.session_state.file_uploaded:
             
             # Convert data types properly
             try:
-                # Convert integer columns
-                for col in INTEGER_COLUMNS:
-                    if col in df.columns:
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                        # Fill NaN with 0 and convert to regular int to avoid Arrow issues
-                        df[col] = df[col].fillna(0).astype('int64')
-                
-                # Convert float columns
-                for col in FLOAT_COLUMNS:
-                    if col in df.columns:
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                # Ensure string columns are properly typed (updated to include entity)
-                string_columns = ['storename', 'operator_name', 'entity', 'country', 'city', 'Tenure']
-                for col in string_columns:
-                    if col in df.columns:
-                        df[col] = df[col].astype(str).replace('nan', '')  # Convert NaN to empty string
+                if not streaming:
+                    timer.start('convert_types', rows_in=len(df), compact=compact_mode)
+                    df = convert_column_types(df)
+                    if compact_mode:
+                        df = compact_column_types(df)
+                    timer.stop('convert_types')['memory_bytes'] = int(df.memory_usage(deep=True).sum())
                 
                 st.success("✅ Data types converted successfully")
                 
-                # Store in session state
-                st.session_state.df = df
-                st.session_state.file_uploaded = True
+                timer.start('save_cached_upload')
+                save_cached_upload(cache_key, df)
+                timer.stop('save_cached_upload')
+                # The upload run ends in a rerun, so its timings are kept for
+                # the Diagnostics expander
+                st.session_state.upload_timer = timer
+                use_dataset(cache_key, df)
                 st.rerun()
                 
             except Exception as e:
@@ -190,12 +314,316 @@ if not st.session_state.file_uploaded:
             st.write("- Verify the file is not corrupted")
             st.info("Please ensure your CSV file contains the required columns: storename, operator_name, entity, country, city, latitude, longitude, value_2024, value_2025, absolute_value_change, percentage_value_change, Tenure, Area")
 
-# Only proceed if data is loaded
-if st.session_state.file_uploaded and st.session_state.df is not None:
-    df = st.session_state.df
+@st.fragment
+def show_map(dataset, filtered_ids, filtered_df, filters_key, viewport_mode, aggregate_mode, search_area=None,
+             heatmap_weight=None):
+    df = dataset.df
+    # Layers of the viewport and aggregation modes are built once per
+    # (dataset, filters, view) and reused, so returning to an earlier
+    # selection does not rebuild them
+    layer_cache = st.session_state.map_layer_cache
+    timer = st.session_state.phase_timer
     
-    # Clean data - remove rows with missing lat/lon
-    df = df.dropna(subset=['latitude', 'longitude'])
+    # Create the map
+    if len(filtered_df) > 0:
+        timer.start('map_layer', rows_in=len(filtered_df))
+
+        # Calculate center of map based on filtered data
+        center_lat = filtered_df['latitude'].mean()
+        center_lon = filtered_df['longitude'].mean()
+        
+        # Create folium map with CartoDB Positron tiles
+        m = folium.Map(
+            location=[center_lat, center_lon], 
+            zoom_start=MAP_ZOOM_START,
+            tiles='CartoDB Positron'
+        )
+        
+        # Outline of a distance search: the point and the circle it covers
+        if search_area is not None:
+            search_lat, search_lon, search_radius_km = search_area
+            folium.Circle([search_lat, search_lon], radius=search_radius_km * 1000,
+                          color='#3388ff', weight=2, fill=False).add_to(m)
+            folium.CircleMarker([search_lat, search_lon], radius=4, color='#3388ff',
+                                fill=True, fill_opacity=1).add_to(m)
+            
+        if viewport_mode or aggregate_mode:
+            # These modes depend on what the browser is showing, so the map
+            # reports its bounds and zoom back and the stores are sent as a
+            # layer added to the map without reloading it
+            map_state = st.session_state.get('store_map')
+            zoom = map_zoom(map_state, MAP_ZOOM_START)
+            
+            if aggregate_mode and zoom < AGGREGATE_BELOW_ZOOM:
+                # Cells are computed over the whole selection once per zoom
+                # level, so panning reuses them
+                bins = dataset.view_cache.get_or_compute(
+                    ('bins', filters_key, zoom), lambda: aggregate_stores(filtered_df, zoom)
+                )
+                stores_layer, _ = layer_cache.get_or_compute(
+                    ('bins', dataset.key, filters_key, zoom), lambda: bin_layer(bins)
+                )
+                shown_df = filtered_df.iloc[:0]
+                map_caption = f"Showing {len(filtered_df)} stores as {len(bins)} areas - zoom in to see individual stores"
+            elif viewport_mode:
+                # Only the stores in and around the area the browser last
+                # reported are drawn
+                query_bounds = viewport_query_bounds(map_state, center_lat, center_lon, MAP_ZOOM_START)
+                visible_ids = intersect_sorted(dataset.spatial_index.query(*query_bounds), filtered_ids)
+                shown_df = df.take(visible_ids)
+                stores_layer, _ = layer_cache.get_or_compute(
+                    ('viewport', dataset.key, filters_key, query_bounds), lambda: store_layer(shown_df)
+                )
+                map_caption = f"Drawing {len(shown_df)} of {len(filtered_df)} stores in and around the current view"
+            else:
+                shown_df = filtered_df
+                stores_layer, _ = layer_cache.get_or_compute(
+                    ('stores', dataset.key, filters_key), lambda: store_layer(shown_df)
+                )
+                map_caption = None
+            timer.stop('map_layer', rows_out=len(shown_df))
+            
+            # Display the map
+            timer.start('map_render')
+            map_data = st_folium(m, key='store_map', width=None, height=500,
+                                 returned_objects=['bounds', 'zoom'],
+                                 feature_group_to_add=stores_layer)
+            render = timer.stop('map_render')
+            if map_caption:
+                st.caption(map_caption)
+        else:
+            # Markers and the heatmap do not depend on the browser's view, so
+            # the whole rendered page is cached per selection and shared by
+            # all sessions; returning to an earlier selection neither builds
+            # nor renders the map again
+            if heatmap_weight is not None:
+                # Density of the chosen weight instead of markers
+                weight_column = HEATMAP_WEIGHTS[heatmap_weight]
+                map_kind = ('heatmap', weight_column)
+                shown_df = filtered_df.iloc[:0]
+            else:
+                # Add markers for each store - large selections are rendered as a
+                # single clustered layer instead of one marker per row
+                map_kind = ('stores',)
+                shown_df = filtered_df
+
+            def render_map():
+                if heatmap_weight is not None:
+                    points = dataset.view_cache.get_or_compute(
+                        ('heatmap', filters_key, weight_column), lambda: heatmap_points(filtered_df, weight_column)
+                    )
+                    heatmap_layer(points, weight_column in SIGNED_HEATMAP_WEIGHTS).add_to(m)
+                else:
+                    store_layer(shown_df)[0].add_to(m)
+                return m.get_root().render()
+
+            map_html = dataset.map_html_cache.get_or_compute(map_kind + (filters_key,), render_map)
+            timer.stop('map_layer', rows_out=len(shown_df))
+            
+            # Display the map
+            timer.start('map_render')
+            st.iframe(map_html, height=500)
+            render = timer.stop('map_render')
+        
+        if st.session_state.get('show_diagnostics'):
+            # Size of the HTML sent to the browser; the view-dependent modes
+            # are rendered a second time, with the store layer attached
+            if viewport_mode or aggregate_mode:
+                stores_layer.add_to(m)
+                map_html = m.get_root().render()
+            render['html_bytes'] = len(map_html.encode('utf-8'))
+        
+        # Legend
+        if heatmap_weight is None:
+            st.markdown("""🟢 Value Increase 🔴 Value Decrease ⚫ No change""")
+        elif HEATMAP_WEIGHTS[heatmap_weight] in SIGNED_HEATMAP_WEIGHTS:
+            st.markdown(f"""🟩 Increase 🟥 Decrease - density weighted by {heatmap_weight.lower()}""")
+        else:
+            st.markdown(f"""Density weighted by {heatmap_weight.lower()}""")
+        if is_high_volume(shown_df):
+            st.caption("Large selection: stores are clustered, zoom in to see individual stores")
+        
+    else:
+        st.warning("No stores match the selected filters.")
+
+
+@st.fragment
+def show_summary(dataset, filtered_df, category_filters, range_filters, near=None):
+    # Display summary statistics
+    st.subheader("Summary Statistics")
+    timer = st.session_state.phase_timer
+    timer.start('summary', rows_in=len(filtered_df))
+
+    # Totals come from the precomputed rollup unless a range slider has
+    # been narrowed or a distance search is on, which needs a scan of the
+    # filtered rows
+    scan_rows = near is not None or dataset.engine.ranges_narrow(range_filters)
+    if scan_rows:
+        totals = summarize(filtered_df)
+    else:
+        totals = dataset.rollup.totals(category_filters)
+
+    col1, col2, col3, col4 = st.columns([1,3,3,3])
+
+    with col1:
+        st.metric("Stores", totals['stores'])
+
+    with col2:
+        sum_2024 = totals['value_2024']
+        st.metric("2024 Value", f"{sum_2024:,}")
+
+    with col3:
+        sum_abs_change = totals['absolute_value_change']
+        sign = "+" if sum_abs_change >= 0 else ""
+        st.metric("Value Change", f"{sign}{sum_abs_change:,}")
+
+    with col4:
+        sum_2025 = totals['value_2025']
+        st.metric("2025 Value", f"{sum_2025:,}")
+
+    # Show per-group breakdown (optional)
+    if st.checkbox("Show Breakdown"):
+        breakdown_by = st.selectbox("Break down by:", list(BREAKDOWN_DIMENSIONS), key="breakdown_by")
+        breakdown_column = BREAKDOWN_DIMENSIONS[breakdown_by]
+        if scan_rows:
+            breakdown = scan_breakdown(filtered_df, breakdown_column)
+        else:
+            breakdown = dataset.rollup.breakdown(breakdown_column, category_filters)
+        breakdown.index.name = breakdown_by
+        breakdown.columns = ['Stores'] + DISPLAY_COLUMNS_DISPLAY_NAMES[1:]
+
+        st.dataframe(
+            breakdown,
+            use_container_width=True,
+            column_config={
+                name: st.column_config.NumberColumn(name, format="localized")
+                for name in breakdown.columns
+            }
+        )
+        st.bar_chart(breakdown['Change in value'].head(BREAKDOWN_CHART_GROUPS))
+        if len(breakdown) > BREAKDOWN_CHART_GROUPS:
+            st.caption(f"Chart shows the {BREAKDOWN_CHART_GROUPS} groups with the highest 2025 value")
+        st.download_button(
+            "⬇️ Download breakdown (CSV)",
+            breakdown.to_csv().encode('utf-8'),
+            file_name=f"breakdown_by_{breakdown_column}.csv",
+            mime="text/csv",
+            on_click="ignore",
+            key="download_breakdown"
+        )
+    timer.stop('summary', source='scan' if scan_rows else 'rollup')
+
+
+@st.fragment
+def show_table(dataset, filtered_ids, filters_key):
+    # Show filtered data table (optional)
+    df = dataset.df
+    
+    if st.checkbox("Show Data Table"):
+        timer = st.session_state.phase_timer
+        timer.start('table', rows_in=len(filtered_ids))
+        # Sorting and paging happen on the filtered row ids, so only the
+        # visible page is copied and sent to the browser
+        table_col1, table_col2, table_col3, table_col4 = st.columns([3, 2, 2, 2])
+        with table_col1:
+            sort_by = st.selectbox("Sort by:", ['File order'] + DISPLAY_COLUMNS_DISPLAY_NAMES, key="table_sort")
+        with table_col2:
+            sort_order = st.radio("Order:", ['Ascending', 'Descending'], horizontal=True, key="table_order")
+        with table_col3:
+            page_size = st.selectbox("Rows per page:", TABLE_PAGE_SIZES, key="table_page_size")
+        with table_col4:
+            n_pages = page_count(len(filtered_ids), page_size)
+            page = st.number_input("Page:", min_value=1, max_value=n_pages, value=1, step=1, key="table_page")
+
+        if sort_by == 'File order':
+            table_ids = filtered_ids if sort_order == 'Ascending' else filtered_ids[::-1]
+        else:
+            sort_column = DISPLAY_COLUMNS[DISPLAY_COLUMNS_DISPLAY_NAMES.index(sort_by)]
+            table_ids = dataset.view_cache.get_or_compute(
+                ('table_order', filters_key, sort_column, sort_order),
+                lambda: sort_row_ids(df, filtered_ids, sort_column, ascending=sort_order == 'Ascending')
+            )
+
+        shown_ids = page_row_ids(table_ids, page, page_size)
+        df_display = df[DISPLAY_COLUMNS].take(shown_ids)
+        df_display.columns = DISPLAY_COLUMNS_DISPLAY_NAMES
+
+        # Add CSS for center alignment - most aggressive approach
+        st.markdown("""
+        <style>
+            /* Force center alignment with maximum specificity */
+            .stDataFrame div[data-testid="stDataFrame"] table td:nth-child(2),
+            .stDataFrame div[data-testid="stDataFrame"] table td:nth-child(3), 
+            .stDataFrame div[data-testid="stDataFrame"] table td:nth-child(4),
+            .stDataFrame div[data-testid="stDataFrame"] table th:nth-child(2),
+            .stDataFrame div[data-testid="stDataFrame"] table th:nth-child(3),
+            .stDataFrame div[data-testid="stDataFrame"] table th:nth-child(4) {
+                text-align: center !important;
+                justify-content: center !important;
+            }
+        </style>
+        """, unsafe_allow_html=True)
+
+        # Wrap the dataframe in a container with a class
+        with st.container():
+            st.markdown('<div class="stDataFrame">', unsafe_allow_html=True)
+            st.dataframe(
+                df_display,
+                use_container_width=True,
+                hide_index=True,
+                # Numbers stay numeric and are formatted by the browser
+                column_config={
+                    name: st.column_config.NumberColumn(name, format="localized")
+                    for name in DISPLAY_COLUMNS_DISPLAY_NAMES[1:]
+                }
+            )
+            st.markdown('</div>', unsafe_allow_html=True)
+        first_row = (page - 1) * page_size + 1 if len(shown_ids) else 0
+        st.caption(f"Rows {first_row:,}-{first_row + len(shown_ids) - 1 if len(shown_ids) else 0:,} of {len(filtered_ids):,}")
+        timer.stop('table', rows_out=len(shown_ids))
+
+
+@st.fragment
+def show_export(dataset, filtered_ids, filters_key):
+    # Files are only generated when a button is clicked, straight from the
+    # filtered row ids in chunks, and kept per filter selection so repeat
+    # downloads of the same view are served from memory
+    df = dataset.df
+
+    def export_file(kind, write):
+        return lambda: dataset.export_cache.get_or_compute((kind, filters_key), lambda: write(df, filtered_ids))
+
+    st.write(f"**Export {len(filtered_ids):,} filtered stores:**")
+    export_col1, export_col2 = st.columns(2)
+    with export_col1:
+        st.download_button(
+            "⬇️ Download CSV",
+            export_file('csv', csv_bytes),
+            file_name="filtered_stores.csv",
+            mime="text/csv",
+            on_click="ignore",
+            use_container_width=True,
+            key="download_csv"
+        )
+    with export_col2:
+        st.download_button(
+            "⬇️ Download Parquet",
+            export_file('parquet', parquet_bytes),
+            file_name="filtered_stores.parquet",
+            mime="application/vnd.apache.parquet",
+            on_click="ignore",
+            disabled=not HAS_PYARROW,
+            help=None if HAS_PYARROW else "Parquet export needs the pyarrow package",
+            use_container_width=True,
+            key="download_parquet"
+        )
+
+
+# Only proceed if data is loaded
+if st.session_state.file_uploaded and dataset is not None:
+    # Clean data - the shared dataset only holds rows with valid lat/lon
+    engine = dataset.engine
+    df = dataset.df
     
     # Sidebar filters and data info
     st.sidebar.header("Filters")
@@ -205,11 +633,39 @@ if st.session_state.file_uploaded and st.session_state.df is not None:
 
         # Reset data button
         if st.button("🔄 Upload New File"):
-            st.session_state.df = None
+            dataset_registry.release(st.session_state.dataset_key, st.session_state.session_id)
+            st.session_state.dataset_key = None
             st.session_state.file_uploaded = False
             st.rerun()
 
+        # Further files, e.g. monthly or per-country updates, are merged into
+        # the loaded stores instead of replacing them
+        merge_files = st.file_uploader(
+            "Add or update stores from more CSV files",
+            type=['csv'],
+            accept_multiple_files=True,
+            help="Rows are matched to loaded stores by store name, operator and city. Changed stores are updated and new stores are added.",
+            key=f"merge_upload_{st.session_state.merge_upload_round}"
+        )
+        if merge_files:
+            merge_uploaded_files(merge_files)
+        merge_error = st.session_state.pop('merge_upload_error', None)
+        if merge_error:
+            st.error(merge_error)
+
         st.info(f"Data loaded: {len(df)} rows, {len(df.columns)} columns")
+        if dataset.merged_files:
+            st.write(f"**Merged files:** {dataset.merged_files}")
+        
+        # Memory used by the loaded data, and what compact mode saved
+        compaction = df.attrs.get('compaction')
+        if compaction:
+            saved_bytes = compaction['before_bytes'] - compaction['after_bytes']
+            saved_pct = 100 * saved_bytes / compaction['before_bytes'] if compaction['before_bytes'] else 0
+            st.write(f"**Memory:** {compaction['after_bytes'] / 1024 ** 2:,.1f} MB "
+                     f"(compact types saved {saved_bytes / 1024 ** 2:,.1f} MB, {saved_pct:.0f}%)")
+        else:
+            st.write(f"**Memory:** {df.memory_usage(deep=True).sum() / 1024 ** 2:,.1f} MB")
         
         # Data preview
         st.subheader("Data Preview")
@@ -217,7 +673,8 @@ if st.session_state.file_uploaded and st.session_state.df is not None:
         
         # Data quality check
         st.subheader("Data Quality Check")
-        missing_coords = df[['latitude', 'longitude']].isnull().any(axis=1).sum()
+        # These rows were dropped when the data was loaded; only the count is kept
+        missing_coords = df.attrs.get('dropped_rows', 0)
         if missing_coords > 0:
             st.warning(f"⚠️ {missing_coords} rows have missing latitude/longitude and will be excluded")
         else:
@@ -232,32 +689,30 @@ if st.session_state.file_uploaded and st.session_state.df is not None:
 
         # Operator filter (before entity filter)
         st.subheader("Operator")
-        operators = ['All'] + sorted(df['operator_name'].unique().tolist())
+        facets = engine.facets
+        operators = facets.options()
         selected_operator = st.radio("Select Operator:", operators, key="operator_radio")
 
         # Entity filter - depends on operator selection
         st.subheader("Entity")
         
-        # Filter entities based on operator selection
-        if selected_operator != 'All':
-            entity_filter_df = df[df['operator_name'] == selected_operator]
-        else:
-            entity_filter_df = df.copy()
-        
-        available_entities = entity_filter_df['entity'].unique().tolist()
-        entities = ['All'] + sorted(available_entities)
+        # Entities available under the operator selection
+        entities = facets.options(selected_operator)
         selected_entity = st.radio("Select Entity:", entities, key="entity_radio")
 
         # Tenure filter
         st.subheader("Tenure")
-        tenures = ['All'] + sorted(df['Tenure'].unique().tolist())
+        tenures = facets.tenures
         selected_tenure = st.radio("Select Tenure:", tenures, key="tenure_radio")
     
+        # Range sliders - their bounds come from the dataset's pre-sorted
+        # range indexes, and each selection is a searchsorted slice of them
+        
         # Area filter
         st.subheader("Area")
-        area_clean = df['Area'].dropna()
-        if len(area_clean) > 0:
-            area_min, area_max = int(area_clean.min()), int(area_clean.max())
+        area_bounds = engine.range_index['Area'].bounds
+        if area_bounds is not None:
+            area_min, area_max = int(area_bounds[0]), int(area_bounds[1])
             if area_min == area_max:
                 area_range = (area_min, area_max)
                 st.write(f"All stores have the same area: {area_min:,}")
@@ -279,9 +734,9 @@ if st.session_state.file_uploaded and st.session_state.df is not None:
     
         # Absolute value change filter
         st.subheader("Absolute Value Change")
-        abs_clean = df['absolute_value_change'].dropna()
-        if len(abs_clean) > 0:
-            abs_min, abs_max = int(abs_clean.min()), int(abs_clean.max())
+        abs_bounds = engine.range_index['absolute_value_change'].bounds
+        if abs_bounds is not None:
+            abs_min, abs_max = int(abs_bounds[0]), int(abs_bounds[1])
             if abs_min == abs_max:
                 abs_range = (abs_min, abs_max)
                 st.write(f"All stores have the same absolute change: {abs_min:,}")
@@ -303,9 +758,9 @@ if st.session_state.file_uploaded and st.session_state.df is not None:
         
         # Percentage value change filter
         st.subheader("Percentage Value Change")
-        pct_clean = df['percentage_value_change'].dropna()
-        if len(pct_clean) > 0:
-            pct_min, pct_max = float(pct_clean.min()), float(pct_clean.max())
+        pct_bounds = engine.range_index['percentage_value_change'].bounds
+        if pct_bounds is not None:
+            pct_min, pct_max = float(pct_bounds[0]), float(pct_bounds[1])
             if pct_min == pct_max:
                 pct_range = (pct_min, pct_max)
                 st.write(f"All stores have the same percentage change: {pct_min}%")
@@ -325,202 +780,205 @@ if st.session_state.file_uploaded and st.session_state.df is not None:
 
     # Location filters in sidebar expander
     with st.sidebar.expander("🌍 Location Filters", expanded=False):  
-        # Country filter - depends on operator and entity selection
-        st.subheader("Country")
-        
-        # Filter countries based on operator and entity selection
-        country_filter_df = df.copy()
-        
-        if selected_operator != 'All':
-            country_filter_df = country_filter_df[country_filter_df['operator_name'] == selected_operator]
-        
-        if selected_entity != 'All':
-            country_filter_df = country_filter_df[country_filter_df['entity'] == selected_entity]
+        # Either the country and city lists, or stores near a point (a store
+        # or coordinates) by radius or count
+        location_mode = st.radio("Filter by:", ['Country & City', 'Distance'], horizontal=True, key="location_mode")
+        near = None
         
-        available_countries = country_filter_df['country'].unique().tolist()
-        countries = ['All'] + sorted(available_countries)
-        selected_country = st.radio("Select Country:", countries, key="country_radio")
-        
-        # City filter - depends on country, operator, and entity selection
-        st.subheader("City")
-        
-        # Filter cities based on country, operator, and entity selection
-        city_filter_df = df.copy()
-        
-        if selected_country != 'All':
-            city_filter_df = city_filter_df[city_filter_df['country'] == selected_country]
-        
-        if selected_operator != 'All':
-            city_filter_df = city_filter_df[city_filter_df['operator_name'] == selected_operator]
-        
-        if selected_entity != 'All':
-            city_filter_df = city_filter_df[city_filter_df['entity'] == selected_entity]
-        
-        available_cities = city_filter_df['city'].unique().tolist()
-        cities = ['All'] + sorted(available_cities)
-        selected_city = st.radio("Select City:", cities, key="city_radio")
-    
-    # Apply filters
-    filtered_df = df.copy()
-    
-    if selected_country != 'All':
-        filtered_df = filtered_df[filtered_df['country'] == selected_country]
+        if location_mode == 'Country & City':
+            # Country filter - depends on operator and entity selection
+            st.subheader("Country")
+            
+            # Countries available under the operator and entity selection
+            countries = facets.options(selected_operator, selected_entity)
+            selected_country = st.radio("Select Country:", countries, key="country_radio")
+            
+            # City filter - depends on country, operator, and entity selection
+            st.subheader("City")
+            
+            # Cities available under the operator, entity and country selection
+            cities = facets.options(selected_operator, selected_entity, selected_country)
+            selected_city = st.radio("Select City:", cities, key="city_radio")
+        else:
+            selected_country = selected_city = 'All'
+            
+            st.subheader("From")
+            point_source = st.radio("Point:", ['Store', 'Coordinates'], horizontal=True, key="near_point_source")
+            near_point = None
+            near_store = None
+            if point_source == 'Store':
+                store_query = st.text_input("Find store:", placeholder="Part of a store name", key="near_store_query")
+                if store_query:
+                    # Name lookups are shared by every session on this dataset
+                    matches = dataset.view_cache.get_or_compute(
+                        ('store_search', store_query.casefold()),
+                        lambda: np.flatnonzero(df['storename'].str.contains(store_query, case=False, regex=False).to_numpy())
+                    )
+                    if len(matches) > 0:
+                        near_store = st.selectbox(
+                            "Store:",
+                            matches[:STORE_SEARCH_LIMIT].tolist(),
+                            format_func=lambda i: f"{df['storename'].iat[i]} - {df['city'].iat[i]} ({df['operator_name'].iat[i]})",
+                            key="near_store"
+                        )
+                        if len(matches) > STORE_SEARCH_LIMIT:
+                            st.caption(f"First {STORE_SEARCH_LIMIT} of {len(matches):,} matching stores")
+                        near_point = (float(df['latitude'].iat[near_store]), float(df['longitude'].iat[near_store]))
+                    else:
+                        st.warning("No store name contains this text")
+            else:
+                near_lat = st.number_input("Latitude:", min_value=-90.0, max_value=90.0,
+                                           value=float(df['latitude'].median()), format="%.5f", key="near_lat")
+                near_lon = st.number_input("Longitude:", min_value=-180.0, max_value=180.0,
+                                           value=float(df['longitude'].median()), format="%.5f", key="near_lon")
+                near_point = (near_lat, near_lon)
+            
+            st.subheader("Stores")
+            near_mode = st.radio("Find:", ['Within radius', 'Nearest'], horizontal=True, key="near_mode")
+            if near_mode == 'Within radius':
+                near_radius_km = st.number_input("Radius (km):", min_value=0.1, max_value=20000.0,
+                                                 value=25.0, step=5.0, key="near_radius_km")
+            else:
+                near_k = st.number_input("Number of stores:", min_value=1, max_value=1000,
+                                         value=10, step=1, key="near_k",
+                                         help="The store searched from is not counted")
+            
+            if near_point is not None:
+                near = {'lat': near_point[0], 'lon': near_point[1], 'exclude': near_store}
+                if near_mode == 'Within radius':
+                    near['radius_km'] = near_radius_km
+                else:
+                    near['k'] = int(near_k)
+            else:
+                st.info("Pick a store to search around")
     
-    if selected_operator != 'All':
-        filtered_df = filtered_df[filtered_df['operator_name'] == selected_operator]
+    # Map display options in sidebar expander
+    with st.sidebar.expander("🗺️ Map Options", expanded=False):
+        map_layer_mode = st.radio("Show stores as:", ['Markers', 'Heatmap'], horizontal=True, key="map_layer_mode")
+        heatmap_weight = None
+        if map_layer_mode == 'Heatmap':
+            heatmap_weight = st.selectbox("Weight by:", list(HEATMAP_WEIGHTS), key="heatmap_weight")
+        
+        # The marker options below do not apply to the heatmap
+        viewport_mode = st.checkbox(
+            "Only draw stores in view",
+            value=False,
+            help="Send only the stores inside the visible map area to the browser. The map redraws after each pan or zoom.",
+            disabled=heatmap_weight is not None,
+            key="viewport_mode"
+        ) and heatmap_weight is None
+        aggregate_mode = st.checkbox(
+            "Group stores into areas when zoomed out",
+            value=False,
+            help=f"Below zoom level {AGGREGATE_BELOW_ZOOM}, show grid cells with store counts and summed values instead of individual stores",
+            disabled=heatmap_weight is not None,
+            key="aggregate_mode"
+        ) and heatmap_weight is None
     
-    if selected_entity != 'All':
-        filtered_df = filtered_df[filtered_df['entity'] == selected_entity]
+    # Timings, memory use and profiling of the dashboard itself (opt-in);
+    # filled in at the end of the run, once every phase has been timed
+    diagnostics_panel = st.sidebar.expander("🩺 Diagnostics", expanded=False)
+    with diagnostics_panel:
+        show_diagnostics = st.checkbox("Show phase timings", value=False, key="show_diagnostics")
+        log_diagnostics = st.checkbox(
+            "Append timings to log file",
+            value=False,
+            help=f"Writes one JSON line per rerun to {DIAGNOSTICS_LOG_PATH}",
+            key="log_diagnostics"
+        )
+        if st.button("Profile next rerun", help="Capture a cProfile of one full rerun of the page"):
+            st.session_state.profile_next_run = True
+            st.rerun()
     
-    if selected_city != 'All':
-        filtered_df = filtered_df[filtered_df['city'] == selected_city]
+    # Apply filters - 'All' leaves a column unfiltered
+    category_filters = {
+        col: value for col, value in [
+            ('country', selected_country),
+            ('operator_name', selected_operator),
+            ('entity', selected_entity),
+            ('city', selected_city),
+            ('Tenure', selected_tenure),
+        ] if value != 'All'
+    }
     
-    if selected_tenure != 'All':
-        filtered_df = filtered_df[filtered_df['Tenure'] == selected_tenure]
+    # Range filters only apply to columns that have valid data
+    range_filters = {}
+    if area_bounds is not None:
+        range_filters['Area'] = area_range
+    if abs_bounds is not None:
+        range_filters['absolute_value_change'] = abs_range
+    if pct_bounds is not None:
+        range_filters['percentage_value_change'] = pct_range
     
-    # Apply Area filter only if we have valid data
-    if len(area_clean) > 0:
-        filtered_df = filtered_df[
-            (filtered_df['Area'] >= area_range[0]) & 
-            (filtered_df['Area'] <= area_range[1]) &
-            (filtered_df['Area'].notna())
-        ]
+    timer.start('filters', rows_in=len(df))
+    filtered_ids = engine.row_ids(category_filters, range_filters)
     
-    # Apply Absolute Value Change filter only if we have valid data
-    if len(abs_clean) > 0:
-        filtered_df = filtered_df[
-            (filtered_df['absolute_value_change'] >= abs_range[0]) & 
-            (filtered_df['absolute_value_change'] <= abs_range[1]) &
-            (filtered_df['absolute_value_change'].notna())
-        ]
+    # Distance search over the stores matching the other filters, answered
+    # by the dataset's grid index
+    search_area = None
+    if near is not None:
+        if 'radius_km' in near:
+            filtered_ids, distances = dataset.spatial_index.within_radius(
+                near['lat'], near['lon'], near['radius_km'], within=filtered_ids
+            )
+            search_area = (near['lat'], near['lon'], near['radius_km'])
+        else:
+            nearest_ids, distances = dataset.spatial_index.nearest(
+                near['lat'], near['lon'], near['k'], within=filtered_ids, exclude=near['exclude']
+            )
+            filtered_ids = np.sort(nearest_ids)
+            search_area = (near['lat'], near['lon'], float(distances.max()) if len(distances) else 0.0)
     
-    # Apply Percentage Value Change filter only if we have valid data
-    if len(pct_clean) > 0:
-        filtered_df = filtered_df[
-            (filtered_df['percentage_value_change'] >= pct_range[0]) & 
-            (filtered_df['percentage_value_change'] <= pct_range[1]) &
-            (filtered_df['percentage_value_change'].notna())
-        ]
+    filtered_df = df.take(filtered_ids)
+    filters_key = filter_signature(category_filters, range_filters, near)
+    timer.stop('filters', rows_out=len(filtered_df))
     
     # Display filtered data info
-    st.info(f"Showing {len(filtered_df)} of {len(df)} stores")
-    
-    # Create the map
-    if len(filtered_df) > 0:
-        # Calculate center of map based on filtered data
-        center_lat = filtered_df['latitude'].mean()
-        center_lon = filtered_df['longitude'].mean()
-        
-        # Create folium map with CartoDB Positron tiles
-        m = folium.Map(
-            location=[center_lat, center_lon], 
-            zoom_start=6,
-            tiles='CartoDB Positron'
-        )
-            
-        # Add markers for each store
-        for idx, row in filtered_df.iterrows():
-            # Create popup content
-            popup_content = f"""
-            <div style="width: 250px;">
-                <h4>{row['storename']}</h4>
-                <p><strong>Operator:</strong> {row['operator_name']}</p>
-                <p><strong>Entity:</strong> {row['entity']}</p>
-                <p><strong>Value 2024:</strong> {row['value_2024']:,}</p>
-                <p><strong>Value 2025:</strong> {row['value_2025']:,}</p>
-                <p><strong>Absolute Change:</strong> {row['absolute_value_change']:,}</p>
-                <p><strong>Percentage Change:</strong> {row['percentage_value_change']:.2f}%</p>
-            </div>
-            """
-            
-            # Determine marker color based on percentage change
-            if row['percentage_value_change'] > 0:
-                color = 'green'
-                icon_color = 'white'
-            elif row['percentage_value_change'] < 0:
-                color = 'red'
-                icon_color = 'white'
-            else:
-                color = 'gray'
-                icon_color = 'white'
-            
-            # Add marker
-            folium.Marker(
-                location=[row['latitude'], row['longitude']],
-                popup=folium.Popup(popup_content, max_width=300),
-                tooltip=row['storename'],
-                icon=folium.Icon(color=color, icon_color=icon_color, icon='info-sign')
-            ).add_to(m)
-            
-        # Display the map
-        map_data = st_folium(m, width=None, height=500, returned_objects=[])
-        
-        # Legend
-        st.markdown("""🟢 Value Increase 🔴 Value Decrease ⚫ No change""")
-        
+    if search_area is not None:
+        st.info(f"Showing {len(filtered_df)} of {len(df)} stores within {search_area[2]:,.1f} km of the selected point")
     else:
-        st.warning("No stores match the selected filters.")
+        st.info(f"Showing {len(filtered_df)} of {len(df)} stores")
+    
+    # Map, statistics and table rerun independently as fragments, so a
+    # widget in one of them does not rebuild the others
+    show_map(dataset, filtered_ids, filtered_df, filters_key, viewport_mode, aggregate_mode, search_area,
+             heatmap_weight)
     
-    # Display summary statistics
     if len(filtered_df) > 0:
-        st.subheader("Summary Statistics")
-        
-        col1, col2, col3, col4 = st.columns([1,3,3,3])
-        
-        with col1:
-            st.metric("Stores", len(filtered_df))
-        
-        with col2:
-            sum_2024 = filtered_df['value_2024'].sum()
-            st.metric("2024 Value", f"{sum_2024:,}")
-        
-        with col3:
-            sum_abs_change = filtered_df['absolute_value_change'].sum()
-            sign = "+" if sum_abs_change >= 0 else ""
-            st.metric("Value Change", f"{sign}{sum_abs_change:,}")
-        
-        with col4:
-            sum_2025 = filtered_df['value_2025'].sum()
-            st.metric("2025 Value", f"{sum_2025:,}")
-        
-        # Show filtered data table (optional)
-        if st.checkbox("Show Data Table"):
-            df_display = filtered_df[DISPLAY_COLUMNS].copy()
-            df_display.columns = DISPLAY_COLUMNS_DISPLAY_NAMES
-            
-            # Ensure proper data types for display to avoid Arrow serialization issues
-            for i, col in enumerate(df_display.columns):
-                if i == 0:  # Store name column - ensure it's string
-                    df_display[col] = df_display[col].astype(str)
-                else:  # Numeric columns - ensure they're numeric format as strings
-                    df_display[col] = pd.to_numeric(df_display[col], errors='coerce').fillna(0)
-                    df_display[col] = df_display[col].apply(lambda x: f"{int(x):,}")
-            
-            # Add CSS for center alignment - most aggressive approach
-            st.markdown("""
-            <style>
-                /* Force center alignment with maximum specificity */
-                .stDataFrame div[data-testid="stDataFrame"] table td:nth-child(2),
-                .stDataFrame div[data-testid="stDataFrame"] table td:nth-child(3), 
-                .stDataFrame div[data-testid="stDataFrame"] table td:nth-child(4),
-                .stDataFrame div[data-testid="stDataFrame"] table th:nth-child(2),
-                .stDataFrame div[data-testid="stDataFrame"] table th:nth-child(3),
-                .stDataFrame div[data-testid="stDataFrame"] table th:nth-child(4) {
-                    text-align: center !important;
-                    justify-content: center !important;
-                }
-            </style>
-            """, unsafe_allow_html=True)
-            
-            # Wrap the dataframe in a container with a class
-            with st.container():
-                st.markdown('<div class="stDataFrame">', unsafe_allow_html=True)
-                st.dataframe(
-                    df_display,
-                    use_container_width=True,
-                    hide_index=True
-                )
-                st.markdown('</div>', unsafe_allow_html=True)
+        show_summary(dataset, filtered_df, category_filters, range_filters, near)
+        show_table(dataset, filtered_ids, filters_key)
+        show_export(dataset, filtered_ids, filters_key)
+    
+    # Diagnostics for this run. Fragment-only reruns (e.g. paging the table)
+    # are timed too but only shown with the next full run of the page
+    if profiler is not None:
+        st.session_state.last_profile = finish_profiler(profiler)
+    with diagnostics_panel:
+        if show_diagnostics:
+            st.dataframe(timer.as_frame(), use_container_width=True, hide_index=True)
+            st.caption(f"Total {sum(phase['ms'] for phase in timer.phases):,.1f} ms")
+            filtered_bytes = filtered_df.memory_usage(deep=True).sum()
+            st.write(f"**DataFrame memory:** {df.memory_usage(deep=True).sum() / 1024 ** 2:,.1f} MB loaded, "
+                     f"{filtered_bytes / 1024 ** 2:,.1f} MB filtered")
+            upload_timer = st.session_state.get('upload_timer')
+            if upload_timer is not None:
+                st.write("**Last upload:**")
+                st.dataframe(upload_timer.as_frame(), use_container_width=True, hide_index=True)
+        if 'last_profile' in st.session_state:
+            profile_bytes, profile_summary = st.session_state.last_profile
+            st.download_button(
+                "⬇️ Download profile",
+                profile_bytes,
+                file_name="dashboard_rerun.prof",
+                mime="application/octet-stream",
+                help="Open with python -m pstats or snakeviz"
+            )
+            with st.container(height=300):
+                st.code(profile_summary, language=None)
+    if log_diagnostics:
+        log_error = timer.append_to_log(dataset=dataset.key, rows=len(df), filtered_rows=len(filtered_df))
+        if log_error:
+            st.sidebar.warning(f"Could not write diagnostics log: {log_error}")
 
 else:
     # No data loaded - show upload instructions
@@ -533,20 +991,4 @@ else:
         
         # Show sample data format
         st.subheader("Expected CSV Format:")
-        sample_data = pd.DataFrame({
-            'storename': ['Store A', 'Store B', 'Store C'],
-            'operator_name': ['Operator 1', 'Operator 2', 'Operator 1'],
-            'entity': ['Entity A', 'Entity B', 'Entity C'],
-            'country': ['USA', 'Canada', 'USA'],
-            'city': ['New York', 'Toronto', 'Los Angeles'],
-            'latitude': [40.7128, 43.6532, 34.0522],
-            'longitude': [-74.0060, -79.3832, -118.2437],
-            'value_2024': [100000, 150000, 80000],
-            'value_2025': [120000, 140000, 95000],
-            'absolute_value_change': [20000, -10000, 15000],
-            'percentage_value_change': [20.0, -6.67, 18.75],
-            'Tenure': ['Owned', 'Leased', 'Owned'],
-            'Area': [2500, 3200, 1800]
-        })
-        
-        st.dataframe(sample_data, use_container_width=True)
+        st.markdown(EXPECTED_FORMAT_PATH.read_text(encoding='utf-8'))
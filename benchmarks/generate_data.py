@@ -0,0 +1,134 @@
+"""Generate synthetic store CSVs with the dashboard's full column schema.
+
+Example:
+    python benchmarks/generate_data.py --rows 100000 --encoding cp1252 -o stores_100k.csv
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# (country, centre latitude, centre longitude, spread in degrees)
+COUNTRIES = [
+    ('United Kingdom', 53.0, -1.8, 2.5),
+    ('France', 46.6, 2.4, 3.0),
+    ('Germany', 51.1, 10.4, 2.8),
+    ('Spain', 40.3, -3.7, 3.0),
+    ('Italy', 42.8, 12.5, 3.0),
+    ('Netherlands', 52.2, 5.3, 0.8),
+    ('Belgium', 50.6, 4.6, 0.7),
+    ('Poland', 52.0, 19.4, 2.5),
+    ('Sweden', 60.1, 15.6, 4.0),
+    ('Portugal', 39.6, -8.0, 1.5),
+    ('Österreich', 47.5, 14.5, 1.2),
+    ('Česko', 49.8, 15.5, 1.2),
+]
+
+# Used in store and city names so that files exercise non-ASCII decoding
+NAME_PARTS = ['Nord', 'Süd', 'Est', 'Ouest', 'Centre', 'Gare', 'Marché', 'Plaza', 'Park', 'Straße', 'Ribeira', 'Høj']
+TENURES = ['Owned', 'Leased', 'Franchise']
+
+
+def generate_stores(rows, operators=40, entities_per_operator=3, countries=len(COUNTRIES),
+                    cities_per_country=25, missing_location_fraction=0.002, seed=0):
+    """Return a DataFrame of synthetic stores with every required column."""
+    rng = np.random.default_rng(seed)
+    countries = COUNTRIES[:max(1, min(countries, len(COUNTRIES)))]
+
+    # Operators have skewed store counts, like real portfolios
+    operator_names = np.array([f"Operator {i + 1:02d}" for i in range(operators)])
+    operator_weights = 1.0 / np.arange(1, operators + 1)
+    operator_ids = rng.choice(operators, rows, p=operator_weights / operator_weights.sum())
+    entity_ids = rng.integers(0, entities_per_operator, rows)
+    entity = np.char.add(np.char.add(operator_names[operator_ids], ' Entity '),
+                         (entity_ids + 1).astype(str))
+
+    # Cities are clusters of stores around a point inside their country
+    country_ids = rng.integers(0, len(countries), rows)
+    city_ids = rng.integers(0, cities_per_country, rows)
+    city_centres = np.array([
+        [lat + rng.normal(0, spread / 2), lon + rng.normal(0, spread / 2)]
+        for _, lat, lon, spread in countries
+        for _ in range(cities_per_country)
+    ])
+    centre_ids = country_ids * cities_per_country + city_ids
+    latitude = city_centres[centre_ids, 0] + rng.normal(0, 0.05, rows)
+    longitude = city_centres[centre_ids, 1] + rng.normal(0, 0.05, rows)
+
+    country_names = np.array([name for name, _, _, _ in countries])
+    city_names = np.array([f"{NAME_PARTS[i % len(NAME_PARTS)]} {name[:3]} {i + 1}"
+                           for name, _, _, _ in countries for i in range(cities_per_country)])
+
+    value_2024 = np.round(rng.lognormal(13, 0.8, rows), -2).astype(np.int64)
+    pct_change = rng.normal(2, 12, rows)
+    value_2025 = np.round(value_2024 * (1 + pct_change / 100), -2).astype(np.int64)
+    absolute_change = value_2025 - value_2024
+    pct_change = np.round(100 * absolute_change / value_2024, 2)
+
+    df = pd.DataFrame({
+        'storename': [f"{NAME_PARTS[i % len(NAME_PARTS)]} Store {i + 1}" for i in range(rows)],
+        'operator_name': operator_names[operator_ids],
+        'entity': entity,
+        'country': country_names[country_ids],
+        'city': city_names[centre_ids],
+        'latitude': np.round(latitude, 6),
+        'longitude': np.round(longitude, 6),
+        'value_2024': value_2024,
+        'value_2025': value_2025,
+        'absolute_value_change': absolute_change,
+        'percentage_value_change': pct_change,
+        'Tenure': rng.choice(TENURES, rows, p=[0.3, 0.6, 0.1]),
+        'Area': rng.integers(80, 6000, rows),
+    })
+
+    # A few stores without coordinates, as in real exports
+    missing = rng.random(rows) < missing_location_fraction
+    df.loc[missing, ['latitude', 'longitude']] = np.nan
+    return df
+
+
+def generate_csv_bytes(rows, encoding='utf-8', **kwargs):
+    """Synthetic store data serialised as CSV in the given encoding."""
+    csv_text = generate_stores(rows, **kwargs).to_csv(index=False)
+    return csv_text.encode(encoding, errors='replace')
+
+
+def parse_rows(value):
+    """Row count from text such as '5000', '10k' or '1m'."""
+    value = value.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=parse_rows, default='10k',
+                        help="Number of stores, e.g. 1k, 10k, 100k or 1m")
+    parser.add_argument('--operators', type=int, default=40)
+    parser.add_argument('--entities-per-operator', type=int, default=3)
+    parser.add_argument('--countries', type=int, default=len(COUNTRIES))
+    parser.add_argument('--cities-per-country', type=int, default=25)
+    parser.add_argument('--encoding', default='utf-8',
+                        help="Output encoding, e.g. utf-8, utf-8-sig, cp1252, utf-16")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', type=Path, required=True)
+    args = parser.parse_args(argv)
+
+    raw = generate_csv_bytes(
+        args.rows,
+        encoding=args.encoding,
+        operators=args.operators,
+        entities_per_operator=args.entities_per_operator,
+        countries=args.countries,
+        cities_per_country=args.cities_per_country,
+        seed=args.seed,
+    )
+    args.output.write_bytes(raw)
+    print(f"Wrote {args.rows:,} stores ({len(raw) / 1024 ** 2:,.1f} MB, {args.encoding}) to {args.output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Time the dashboard's data paths headlessly and write the results as JSON.
+
+Covers encoding detection and parse, type conversion, index building, the
+sidebar filter chain and map layer construction with its rendered payload
+size. Compare result files between versions to catch regressions.
+
+Example:
+    python benchmarks/run_benchmarks.py --sizes 1k 10k 100k -o bench_results.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import folium  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from data_loading import compact_column_types, convert_column_types, read_store_csv  # noqa: E402
+from filter_engine import FilterEngine  # noqa: E402
+from generate_data import generate_csv_bytes, parse_rows  # noqa: E402
+from map_layers import aggregate_stores, bin_layer, store_layer  # noqa: E402
+
+
+def timed(func, repeat):
+    """Best wall time over ``repeat`` calls, and the last result."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def filter_selections(df):
+    """Representative sidebar selections: none, one operator, a narrow combination."""
+    operator = df['operator_name'].value_counts().index[0]
+    by_operator = df[df['operator_name'] == operator]
+    country = by_operator['country'].value_counts().index[0]
+    area_low, area_high = np.percentile(df['Area'], [25, 75])
+    full_ranges = {col: (df[col].min(), df[col].max())
+                   for col in ['Area', 'absolute_value_change', 'percentage_value_change']}
+    return {
+        'all': ({}, full_ranges),
+        'operator': ({'operator_name': operator}, full_ranges),
+        'operator_country_area': (
+            {'operator_name': operator, 'country': country, 'Tenure': 'Leased'},
+            {**full_ranges, 'Area': (int(area_low), int(area_high))},
+        ),
+    }
+
+
+def render_size(layer):
+    m = folium.Map(location=[50, 5], zoom_start=6)
+    layer.add_to(m)
+    return len(m.get_root().render().encode('utf-8'))
+
+
+def benchmark_size(rows, encoding, repeat, seed):
+    results = []
+
+    def record(phase, seconds, **extra):
+        results.append({'rows': rows, 'phase': phase, 'seconds': round(seconds, 6), **extra})
+        print(f"{rows:>9,} rows  {phase:<40} {seconds * 1000:>10.1f} ms  {extra or ''}")
+
+    raw = generate_csv_bytes(rows, encoding=encoding, seed=seed)
+
+    seconds, (parsed, detected, _) = timed(lambda: read_store_csv(raw), repeat)
+    record('detect_encoding_and_parse', seconds, csv_bytes=len(raw), encoding=encoding,
+           detected_encoding=detected)
+
+    seconds, converted = timed(lambda: convert_column_types(parsed.copy()), repeat)
+    record('convert_column_types', seconds, memory_bytes=int(converted.memory_usage(deep=True).sum()))
+
+    seconds, compact = timed(lambda: compact_column_types(converted.copy()), repeat)
+    record('compact_column_types', seconds, memory_bytes=int(compact.memory_usage(deep=True).sum()))
+
+    clean = compact.dropna(subset=['latitude', 'longitude'])
+    seconds, engine = timed(lambda: FilterEngine(clean), repeat)
+    record('build_filter_engine', seconds)
+
+    for name, (equals, ranges) in filter_selections(clean).items():
+        seconds, selected = timed(lambda: engine.select(equals, ranges), repeat)
+        record(f'filter:{name}', seconds, rows_out=len(selected))
+
+        seconds, (layer, _) = timed(lambda: store_layer(selected), repeat)
+        record(f'store_layer:{name}', seconds, payload_bytes=render_size(layer))
+
+    seconds, bins = timed(lambda: aggregate_stores(clean, 6), repeat)
+    layer, _ = bin_layer(bins)
+    record('aggregate_stores:zoom6', seconds, cells=len(bins), payload_bytes=render_size(layer))
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=parse_rows, default=[1_000, 10_000, 100_000],
+                        help="Row counts to benchmark, e.g. 1k 10k 100k 1m")
+    parser.add_argument('--encoding', default='cp1252',
+                        help="Encoding of the generated CSV (cp1252 exercises the fallback detection)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per phase; the best time is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', type=Path, default=Path('bench_results.json'))
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.sizes:
+        results.extend(benchmark_size(rows, args.encoding, args.repeat, args.seed))
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'folium': folium.__version__,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {len(results)} measurements to {args.output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Time the first paint of the upload screen in fresh processes and check it against a target.
+
+Each sample starts a new interpreter, imports Streamlit (as a running server
+already has) and times the first headless run of app.py, which draws the
+upload screen. Modules that the upload screen should not need are reported
+if the run imported them. Exits with status 1 if the median time is over the
+target, so the check can run in CI.
+
+Example:
+    python benchmarks/startup_benchmark.py --samples 5 -o startup_results.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = REPO_ROOT / 'app.py'
+
+# Median first-run time of the upload screen the dashboard should stay under
+FIRST_PAINT_TARGET_SECONDS = 0.5
+
+# Dependencies that are only needed once a dataset is loaded
+DEFERRED_MODULES = ['numpy', 'pandas', 'pyarrow', 'folium', 'streamlit_folium']
+
+# Runs in the child process; prints one JSON object
+SAMPLE_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+start = time.perf_counter()
+at.run()
+first_run = time.perf_counter() - start
+start = time.perf_counter()
+at.run()
+print(json.dumps({
+    'first_run_seconds': first_run,
+    'rerun_seconds': time.perf_counter() - start,
+    'exception': [str(e.value) for e in at.exception],
+    'deferred_modules_loaded': [m for m in json.loads(sys.argv[2]) if m in sys.modules],
+}))
+"""
+
+
+def run_sample(app_path):
+    completed = subprocess.run(
+        [sys.executable, '-c', SAMPLE_SCRIPT, str(app_path), json.dumps(DEFERRED_MODULES)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=5, help="Fresh processes to time")
+    parser.add_argument('--target', type=float, default=FIRST_PAINT_TARGET_SECONDS,
+                        help="Maximum median first-run time in seconds")
+    parser.add_argument('--app', type=Path, default=APP_PATH)
+    parser.add_argument('-o', '--output', type=Path, default=Path('startup_results.json'))
+    args = parser.parse_args(argv)
+
+    samples = []
+    for i in range(args.samples):
+        sample = run_sample(args.app)
+        samples.append(sample)
+        print(f"sample {i + 1}: first run {sample['first_run_seconds'] * 1000:>7.1f} ms  "
+              f"rerun {sample['rerun_seconds'] * 1000:>6.1f} ms  "
+              f"deferred modules loaded: {sample['deferred_modules_loaded'] or 'none'}")
+        if sample['exception']:
+            print(f"  app raised: {sample['exception']}")
+
+    median = statistics.median(sample['first_run_seconds'] for sample in samples)
+    passed = median <= args.target and not any(sample['exception'] for sample in samples)
+    print(f"Median first paint {median * 1000:.1f} ms, target {args.target * 1000:.0f} ms: "
+          f"{'OK' if passed else 'FAILED'}")
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'target_seconds': args.target,
+        'median_first_run_seconds': round(median, 6),
+        'passed': passed,
+        'samples': samples,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {len(samples)} samples to {args.output}")
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,280 @@
+import codecs
+import io
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow  # enables pandas' multi-threaded pyarrow CSV engine
+    import pyarrow.csv as pyarrow_csv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+REQUIRED_COLUMNS = ['storename', 'operator_name', 'entity', 'country', 'city', 'latitude', 'longitude',
+                    'value_2024', 'value_2025', 'absolute_value_change', 'percentage_value_change',
+                    'Tenure', 'Area']
+INTEGER_COLUMNS = ['value_2024', 'value_2025', 'absolute_value_change', 'Area']
+FLOAT_COLUMNS = ['latitude', 'longitude', 'percentage_value_change']
+STRING_COLUMNS = ['storename', 'operator_name', 'entity', 'country', 'city', 'Tenure']
+ENCODINGS_TO_TRY = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252', 'utf-16', 'utf-8-sig']
+
+# In compact mode, string columns with at most this share of distinct values
+# are stored as category; value and area columns get the smallest integer type
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+DOWNCAST_COLUMNS = INTEGER_COLUMNS
+
+# Byte-order marks checked before any trial decoding (longest first)
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# Size of the prefix that is trial-decoded to pick an encoding
+ENCODING_SAMPLE_BYTES = 1 << 20
+
+# Dtypes declared up front for the required columns. Integer columns are read
+# as floats so that blanks survive parsing; convert_column_types() fills and
+# narrows them afterwards.
+CSV_DTYPES = {
+    **{col: 'string' for col in STRING_COLUMNS},
+    **{col: 'float64' for col in INTEGER_COLUMNS + FLOAT_COLUMNS},
+}
+
+# Files at least this large are parsed in chunks by stream_store_csv(), so
+# the whole file never exists as one text-typed frame. pyarrow's reader
+# produces chunks of about STREAM_BLOCK_BYTES; the pandas fallback reads
+# STREAM_CHUNK_ROWS rows at a time
+STREAMING_MIN_BYTES = 25 * 1024 ** 2
+STREAM_BLOCK_BYTES = 8 * 1024 ** 2
+STREAM_CHUNK_ROWS = 100_000
+LOCATION_COLUMNS = ['latitude', 'longitude']
+
+# Cells read as missing by the pyarrow streaming reader, the same defaults
+# pandas applies to its own parsers
+CSV_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                 '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+
+def candidate_encodings(raw):
+    """Encodings worth parsing ``raw`` with, most likely first.
+
+    A byte-order mark settles the question outright. Otherwise each entry of
+    ENCODINGS_TO_TRY is trial-decoded against a bounded prefix of the file and
+    yielded if the prefix decodes cleanly.
+    """
+    for bom, encoding in BOMS:
+        if raw.startswith(bom):
+            yield encoding
+            return
+
+    sample = raw[:ENCODING_SAMPLE_BYTES]
+    is_whole_file = len(sample) == len(raw)
+    for encoding in ENCODINGS_TO_TRY:
+        # An incremental decoder tolerates a multi-byte character cut off at
+        # the end of the sample
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            decoder.decode(sample, final=is_whole_file)
+        except UnicodeDecodeError:
+            continue
+        yield encoding
+
+
+def parse_csv(raw, encoding):
+    """Parse CSV bytes once with the given encoding."""
+    if HAS_PYARROW:
+        try:
+            return pd.read_csv(io.BytesIO(raw), encoding=encoding, engine='pyarrow', dtype=CSV_DTYPES)
+        except UnicodeDecodeError:
+            raise
+        except ValueError:
+            # e.g. text in a numeric column - fall back to the tolerant parser
+            # and let convert_column_types() coerce it
+            pass
+    return pd.read_csv(io.BytesIO(raw), encoding=encoding,
+                       dtype={col: 'string' for col in STRING_COLUMNS})
+
+
+def read_store_csv(raw):
+    """Detect the encoding of ``raw`` and parse it.
+
+    Returns ``(df, encoding, error_messages)``; ``df`` and ``encoding`` are
+    None if no candidate encoding could parse the file.
+    """
+    error_messages = []
+    for encoding in candidate_encodings(raw):
+        try:
+            return parse_csv(raw, encoding), encoding, error_messages
+        except Exception as e:
+            error_messages.append(f"{encoding}: {str(e)[:100]}...")
+    return None, None, error_messages
+
+
+def stream_store_csv(raw, compact=False, chunk_rows=STREAM_CHUNK_ROWS, on_progress=None):
+    """Detect the encoding of ``raw`` and parse it chunk by chunk.
+
+    Chunks come from pyarrow's multi-threaded streaming reader when it is
+    installed and can read the file, otherwise from the pandas parser in
+    chunks of ``chunk_rows`` rows. Each chunk is type-converted and rows without a valid latitude/longitude
+    are discarded before it is added to a per-column buffer; in compact mode
+    repetitive string columns are buffered as categoricals. The result is the
+    frame that convert_column_types() (and compact_column_types() if ``compact``) would
+    give, minus the invalid-location rows, whose count is recorded in
+    ``df.attrs['dropped_rows']``. If the header lacks required columns, only
+    the first chunk is returned so the caller can report them.
+
+    ``on_progress(fraction, rows)`` is called after every chunk with the share
+    of the file read so far. Returns ``(df, encoding, error_messages)`` like
+    read_store_csv().
+    """
+    error_messages = []
+    for encoding in candidate_encodings(raw):
+        try:
+            return _stream_csv(raw, encoding, compact, chunk_rows, on_progress), encoding, error_messages
+        except Exception as e:
+            error_messages.append(f"{encoding}: {str(e)[:100]}...")
+    return None, None, error_messages
+
+
+def _stream_csv(raw, encoding, compact, chunk_rows, on_progress):
+    if HAS_PYARROW:
+        try:
+            return _collect_chunks(_arrow_chunks(raw, encoding), len(raw), compact, on_progress)
+        except UnicodeDecodeError:
+            raise
+        except ValueError:
+            # e.g. text in a numeric column - fall back to the tolerant
+            # parser, as parse_csv() does
+            pass
+    return _collect_chunks(_pandas_chunks(raw, encoding, chunk_rows), len(raw), compact, on_progress)
+
+
+def _arrow_chunks(raw, encoding):
+    # Yields (chunk, bytes read so far). Blocks are parsed on pyarrow's thread
+    # pool ahead of the chunk being converted, so the position is counted in
+    # blocks of about STREAM_BLOCK_BYTES rather than taken from the buffer
+    reader = pyarrow_csv.open_csv(
+        pyarrow.BufferReader(raw),
+        read_options=pyarrow_csv.ReadOptions(encoding=encoding, block_size=STREAM_BLOCK_BYTES),
+        convert_options=pyarrow_csv.ConvertOptions(
+            column_types={col: pyarrow.string() if dtype == 'string' else pyarrow.float64()
+                          for col, dtype in CSV_DTYPES.items()},
+            null_values=CSV_NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    for blocks, batch in enumerate(reader, start=1):
+        yield batch.to_pandas(), blocks * STREAM_BLOCK_BYTES
+
+
+def _pandas_chunks(raw, encoding, chunk_rows):
+    source = io.BytesIO(raw)
+    with pd.read_csv(source, encoding=encoding, chunksize=chunk_rows,
+                     dtype={col: 'string' for col in STRING_COLUMNS}) as reader:
+        for chunk in reader:
+            yield chunk, source.tell()
+
+
+def _collect_chunks(chunks, total_bytes, compact, on_progress):
+    buffers = {}
+    rows = dropped_rows = before_bytes = 0
+    for chunk, bytes_read in chunks:
+        if any(col not in chunk.columns for col in REQUIRED_COLUMNS):
+            return chunk
+
+        chunk = convert_column_types(chunk)
+        valid = chunk[LOCATION_COLUMNS].notna().all(axis=1).to_numpy()
+        dropped_rows += int(len(valid) - valid.sum())
+        chunk = chunk[valid]
+        before_bytes += int(chunk.memory_usage(deep=True, index=False).sum())
+
+        for col in chunk.columns:
+            values = chunk[col]
+            if compact and col in STRING_COLUMNS and _is_repetitive(values):
+                values = values.astype('category')
+            elif compact and col in DOWNCAST_COLUMNS:
+                values = pd.to_numeric(values, downcast='integer')
+            buffers.setdefault(col, []).append(values)
+        rows += len(chunk)
+
+        if on_progress is not None:
+            on_progress(min(bytes_read / max(total_bytes, 1), 1.0), rows)
+
+    # Columns are assembled one at a time, releasing each column's chunks.
+    # Whether text is stored as category is settled on the whole column, as
+    # in compact_column_types(), since single chunks can fall either side
+    columns = {}
+    for col in list(buffers):
+        values = _concat_column(buffers.pop(col), rows)
+        if (compact and col in STRING_COLUMNS and not isinstance(values.dtype, pd.CategoricalDtype)
+                and _is_repetitive(values)):
+            values = values.astype('category')
+        columns[col] = values
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs['dropped_rows'] = dropped_rows
+    if compact:
+        df.attrs['compaction'] = {
+            'before_bytes': before_bytes,
+            'after_bytes': int(df.memory_usage(deep=True).sum()),
+        }
+    return df
+
+
+def _is_repetitive(values):
+    # Same rule as compact_column_types(): mostly-unique text stays text
+    return values.nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(values)
+
+
+def _concat_column(parts, rows):
+    if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+        values = union_categoricals(parts, sort_categories=True)
+        if len(values.categories) <= CATEGORY_MAX_UNIQUE_RATIO * rows:
+            return values
+    parts = [part.astype(str) if isinstance(part.dtype, pd.CategoricalDtype) else part for part in parts]
+    return pd.concat(parts, ignore_index=True)
+
+
+def convert_column_types(df):
+    """Coerce the required columns to the types the dashboard expects (in place)."""
+    # Convert integer columns
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+            # Fill NaN with 0 and convert to regular int to avoid Arrow issues
+            df[col] = df[col].fillna(0).astype('int64')
+
+    # Convert float columns
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # Ensure string columns are properly typed
+    for col in STRING_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].fillna('').astype(str).replace('nan', '')  # Convert NaN to empty string
+    return df
+
+
+def compact_column_types(df):
+    """Store low-cardinality strings as category and downcast integer columns (in place).
+
+    The memory used before and after is recorded in ``df.attrs['compaction']``.
+    """
+    before_bytes = int(df.memory_usage(deep=True).sum())
+
+    for col in STRING_COLUMNS:
+        if col in df.columns and df[col].nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(df):
+            df[col] = df[col].astype('category')
+
+    for col in DOWNCAST_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+
+    df.attrs['compaction'] = {
+        'before_bytes': before_bytes,
+        'after_bytes': int(df.memory_usage(deep=True).sum()),
+    }
+    return df
@@ -0,0 +1,225 @@
+import hashlib
+import threading
+import time
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from caching import BoundedCache
+from filter_engine import FilterEngine
+from rollup import RollupCube
+from spatial_index import GridIndex
+from store_upsert import plan_upsert, store_key_index, upsert_frame
+
+
+# A session that has not rerun for this long no longer holds its dataset, and
+# datasets held by no session are dropped from memory
+IDLE_SESSION_SECONDS = 30 * 60
+
+# Memory bound for results derived from a dataset (map aggregates and the like)
+VIEW_CACHE_MAX_BYTES = 64 * 1024 ** 2
+
+# Memory bound for generated download files, kept apart so that large exports
+# do not push out the map and table results
+EXPORT_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+# Memory bound for rendered map pages, which are several hundred bytes per
+# store drawn; this holds the page of a whole 300k-store dataset and more
+MAP_HTML_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+
+class SharedDataset:
+    """One loaded store dataset, shared read-only by every session using it."""
+
+    def __init__(self, key, df, engine=None):
+        self.key = key
+        if engine is None:
+            # Only rows with a usable location are kept and indexed; how many
+            # were left out (here or while streaming the upload) is kept in attrs
+            engine = FilterEngine(_located(df))
+        self.engine = engine
+        # Number of files merged into the first upload, and the stores the
+        # last merge updated, added and left unchanged
+        self.merged_files = 0
+        self.upsert_counts = None
+        # Session id -> time of that session's last access
+        self.sessions = {}
+        # Results derived from filter selections, shared by all sessions and
+        # keyed by (kind, filter signature, ...)
+        self.view_cache = BoundedCache(VIEW_CACHE_MAX_BYTES)
+        # Download files keyed by (format, filter signature)
+        self.export_cache = BoundedCache(EXPORT_CACHE_MAX_BYTES)
+        # Rendered map pages of the modes that do not depend on the browser's
+        # view, keyed by (kind, filter signature, ...)
+        self.map_html_cache = BoundedCache(MAP_HTML_CACHE_MAX_BYTES)
+
+    @property
+    def df(self):
+        return self.engine.df
+
+    @cached_property
+    def rollup(self):
+        return RollupCube(self.df)
+
+    @cached_property
+    def spatial_index(self):
+        # Only built once a session actually asks for viewport rendering
+        return GridIndex(self.df['latitude'].to_numpy(), self.df['longitude'].to_numpy())
+
+    @cached_property
+    def store_keys(self):
+        # Only built once a file is merged into this dataset
+        return store_key_index(self.df)
+
+    def upserted(self, key, delta):
+        """A new dataset with the stores in ``delta`` merged in; this one is left as is.
+
+        Rows are matched by store key. Changed stores keep their row ids and
+        new stores are appended, so the indexes, facets and rollup this
+        dataset has built are updated for those rows only. Returns
+        ``(dataset, counts)`` with the number of updated, added and unchanged
+        stores; ``dataset`` is this one if nothing changed.
+        """
+        located = _located(delta)
+        positions, changed_rows, new_rows, unchanged = plan_upsert(self.df, self.store_keys, located)
+        counts = {'updated': len(positions), 'added': len(new_rows), 'unchanged': unchanged}
+        if not len(positions) and not len(new_rows):
+            return self, counts
+
+        df = upsert_frame(self.df, positions, changed_rows, new_rows)
+        df.attrs['dropped_rows'] = self.df.attrs.get('dropped_rows', 0) + located.attrs['dropped_rows']
+        compaction = self.df.attrs.get('compaction')
+        if compaction:
+            # Appended rows arrive uncompacted, so their size as read counts
+            # towards the size before compaction
+            df.attrs['compaction'] = {
+                'before_bytes': compaction['before_bytes'] + int(new_rows.memory_usage(deep=True, index=False).sum()),
+                'after_bytes': int(df.memory_usage(deep=True).sum()),
+            }
+        new_ids = np.concatenate([positions, np.arange(len(self.df), len(df))])
+        old_rows = self.df.take(positions)
+
+        dataset = SharedDataset(key, df, engine=self.engine.upserted(df, positions, old_rows, new_ids))
+        dataset.merged_files = self.merged_files + 1
+        store_keys = pd.concat([self.store_keys, store_key_index(new_rows, offset=len(self.df))])
+        dataset.__dict__['store_keys'] = store_keys[~store_keys.index.duplicated(keep='last')]
+        if 'rollup' in self.__dict__:
+            dataset.__dict__['rollup'] = self.rollup.upserted(old_rows, df.take(new_ids))
+        if 'spatial_index' in self.__dict__:
+            dataset.__dict__['spatial_index'] = self.spatial_index.upserted(
+                new_ids, df['latitude'].to_numpy()[new_ids], df['longitude'].to_numpy()[new_ids]
+            )
+        return dataset, counts
+
+
+class DatasetRegistry:
+    """Process-wide datasets keyed by upload content hash.
+
+    Sessions keep only the key in their session state and must not modify the
+    shared DataFrame.
+    """
+
+    def __init__(self, idle_seconds=IDLE_SESSION_SECONDS):
+        self.idle_seconds = idle_seconds
+        self._datasets = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    def register(self, key, df, session_id):
+        """Share ``df`` under ``key`` (unless already loaded) and attach the session."""
+        with self._lock:
+            dataset = self._datasets.get(key)
+        if dataset is None:
+            # Build the indexes outside the lock so other sessions are not blocked
+            dataset = SharedDataset(key, df)
+        # The session is attached in the same locked step that shares the
+        # dataset, so an eviction cannot drop it before it has a session
+        with self._lock:
+            dataset = self._datasets.setdefault(key, dataset)
+            dataset.sessions[session_id] = time.monotonic()
+            self._start_sweeper()
+        return dataset
+
+    def get(self, key, session_id):
+        """Return the dataset for ``key`` and record the access, or None if not loaded."""
+        now = time.monotonic()
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is not None:
+                dataset.sessions[session_id] = now
+            self._evict_idle(now)
+        return dataset
+
+    def upsert(self, key, delta_key, delta, session_id):
+        """Merge ``delta`` into the dataset under ``key`` and move the session to the result.
+
+        The merged dataset is shared like an upload, keyed by both content
+        keys, so sessions merging the same file into the same data share it.
+        Returns ``(dataset, counts)``, or ``(None, None)`` if ``key`` is no
+        longer loaded.
+        """
+        base = self.get(key, session_id)
+        if base is None:
+            return None, None
+        merged_key = hashlib.sha256(f"{key}+{delta_key}".encode()).hexdigest()
+        with self._lock:
+            dataset = self._datasets.get(merged_key)
+        if dataset is None:
+            # Built outside the lock, as in register()
+            dataset, counts = base.upserted(merged_key, delta)
+            if dataset is base:
+                return base, counts
+            dataset.upsert_counts = counts
+        with self._lock:
+            dataset = self._datasets.setdefault(merged_key, dataset)
+            dataset.sessions[session_id] = time.monotonic()
+        self.release(key, session_id)
+        return dataset, dataset.upsert_counts
+
+    def release(self, key, session_id):
+        """Detach a session from its dataset, dropping the dataset if unused."""
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is not None:
+                dataset.sessions.pop(session_id, None)
+            self._evict_idle(time.monotonic())
+
+    def sweep(self):
+        """Drop idle sessions and any datasets left without one."""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def _start_sweeper(self):
+        # Periodic sweeps free memory even when no session reruns at all
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_periodically, daemon=True,
+                                             name='dataset-registry-sweeper')
+            self._sweeper.start()
+
+    def _sweep_periodically(self):
+        while True:
+            time.sleep(max(self.idle_seconds / 2, 1))
+            self.sweep()
+
+    def _evict_idle(self, now):
+        for key, dataset in list(self._datasets.items()):
+            for session_id, last_seen in list(dataset.sessions.items()):
+                if now - last_seen > self.idle_seconds:
+                    del dataset.sessions[session_id]
+            if not dataset.sessions:
+                del self._datasets[key]
+
+    def __len__(self):
+        return len(self._datasets)
+
+
+def _located(df):
+    located = df.dropna(subset=['latitude', 'longitude'])
+    located.attrs['dropped_rows'] = df.attrs.get('dropped_rows', 0) + len(df) - len(located)
+    return located
+
+
+# Module globals live for the whole server process, so every session sees the
+# same registry
+registry = DatasetRegistry()
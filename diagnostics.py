@@ -0,0 +1,70 @@
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+# Phase timings are appended here, one JSON object per rerun, when logging is
+# switched on in the Diagnostics expander
+DIAGNOSTICS_LOG_PATH = Path(os.environ.get('STORE_DASHBOARD_DIAGNOSTICS_LOG', 'diagnostics.jsonl'))
+PROFILE_SUMMARY_LINES = 30
+
+
+class PhaseTimer:
+    """Wall time and row/byte counts for the phases of one script run."""
+
+    def __init__(self):
+        self.started = datetime.now(timezone.utc)
+        self.phases = []
+        self._open = {}
+
+    def start(self, name, **details):
+        self._open[name] = (time.perf_counter(), details)
+
+    def stop(self, name, **details):
+        """End phase ``name`` and return its record, which callers may extend."""
+        started, start_details = self._open.pop(name)
+        self.phases.append({
+            'phase': name,
+            'ms': round((time.perf_counter() - started) * 1000, 2),
+            **start_details,
+            **details,
+        })
+        return self.phases[-1]
+
+    def as_frame(self):
+        # Imported here so that timing the upload screen does not load pandas
+        import pandas as pd
+        return pd.DataFrame(self.phases)
+
+    def append_to_log(self, path=DIAGNOSTICS_LOG_PATH, **context):
+        """Append this run's phases to a JSONL file; errors are returned, not raised."""
+        entry = {'started': self.started.isoformat(timespec='milliseconds'), **context, 'phases': self.phases}
+        try:
+            with open(path, 'a', encoding='utf-8') as log:
+                log.write(json.dumps(entry, default=str) + '\n')
+        except OSError as e:
+            return str(e)
+        return None
+
+
+def start_profiler():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def finish_profiler(profiler):
+    """Stop ``profiler`` and return (pstats file bytes, text summary of the top calls)."""
+    profiler.disable()
+    profiler.create_stats()
+    # Same format as Profile.dump_stats(), readable by pstats and snakeviz
+    stats_bytes = marshal.dumps(profiler.stats)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(PROFILE_SUMMARY_LINES)
+    return stats_bytes, summary.getvalue()
@@ -0,0 +1,42 @@
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# Selected rows are copied out of the loaded frame this many at a time, so an
+# export never holds more than one chunk of the selection as a DataFrame
+EXPORT_CHUNK_ROWS = 100_000
+
+
+def row_chunks(df, row_ids, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Rows ``row_ids`` of ``df`` as consecutive DataFrames of at most ``chunk_rows`` rows."""
+    for start in range(0, len(row_ids), chunk_rows):
+        yield df.take(row_ids[start:start + chunk_rows])
+
+
+def csv_bytes(df, row_ids, chunk_rows=EXPORT_CHUNK_ROWS):
+    """UTF-8 CSV of the rows ``row_ids`` of ``df``, written chunk by chunk."""
+    buffer = io.BytesIO()
+    df.iloc[:0].to_csv(buffer, index=False, encoding='utf-8')
+    for chunk in row_chunks(df, row_ids, chunk_rows):
+        chunk.to_csv(buffer, index=False, header=False, encoding='utf-8')
+    return buffer.getvalue()
+
+
+def parquet_bytes(df, row_ids, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Parquet file of the rows ``row_ids`` of ``df``, one row group per chunk.
+
+    Category columns are written as dictionary-encoded strings and read back
+    as category by pandas.
+    """
+    buffer = io.BytesIO()
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(buffer, schema) as writer:
+        for chunk in row_chunks(df, row_ids, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    return buffer.getvalue()
@@ -0,0 +1,234 @@
+import copy
+
+import numpy as np
+
+
+# Columns filtered by exact match (radio lists) and by range (sliders)
+CATEGORICAL_FILTER_COLUMNS = ['country', 'operator_name', 'entity', 'city', 'Tenure']
+RANGE_FILTER_COLUMNS = ['Area', 'absolute_value_change', 'percentage_value_change']
+
+# Cascading radio lists, outermost first: each list only offers values that
+# occur under the selections made in the lists before it
+FACET_COLUMNS = ['operator_name', 'entity', 'country', 'city']
+
+EMPTY_ROW_IDS = np.empty(0, dtype=np.int64)
+
+
+class RangeIndex:
+    """Non-missing values of one numeric column, sorted, with their row ids."""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype='float64')
+        valid_ids = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[valid_ids], kind='stable')
+        self.row_ids = valid_ids[order]
+        self.sorted_values = values[self.row_ids]
+        self.has_missing = len(self.row_ids) < len(values)
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    @property
+    def bounds(self):
+        """(min, max) of the non-missing values, or None if there are none."""
+        if len(self.row_ids) == 0:
+            return None
+        return self.sorted_values[0], self.sorted_values[-1]
+
+    def select(self, low, high):
+        """Row ids with low <= value <= high, or None if nothing is excluded."""
+        start = np.searchsorted(self.sorted_values, low, side='left')
+        stop = np.searchsorted(self.sorted_values, high, side='right')
+        if start == 0 and stop == len(self.row_ids) and not self.has_missing:
+            return None
+        return self.row_ids[start:stop]
+
+    def upserted(self, remove_ids, add_ids, add_values, n_rows):
+        """New index with rows ``remove_ids`` taken out and ``add_ids`` put in with ``add_values``.
+
+        The new values are sorted on their own and merged into the existing
+        order, so the cost is linear in the column rather than a full re-sort.
+        """
+        removed = np.zeros(n_rows, dtype=bool)
+        removed[remove_ids] = True
+        keep = ~removed[self.row_ids]
+        add_values = np.asarray(add_values, dtype='float64')
+        valid = ~np.isnan(add_values)
+        order = np.argsort(add_values[valid], kind='stable')
+        add_ids, add_values = np.asarray(add_ids)[valid][order], add_values[valid][order]
+
+        updated = copy.copy(self)
+        sorted_values = self.sorted_values[keep]
+        at = np.searchsorted(sorted_values, add_values, side='right')
+        updated.row_ids = np.insert(self.row_ids[keep], at, add_ids)
+        updated.sorted_values = np.insert(sorted_values, at, add_values)
+        updated.has_missing = len(updated.row_ids) < n_rows
+        return updated
+
+
+class FacetHierarchy:
+    """Operator -> entity -> country -> city tree for the sidebar radio lists.
+
+    Option lists are computed from the tree on first request and memoized by
+    the tuple of selections above them, so reruns are dictionary lookups.
+    """
+
+    def __init__(self, df):
+        # Store counts per combination, so that updates can tell when the
+        # last store of a combination is gone
+        self.counts = df.groupby(FACET_COLUMNS, observed=True).size().to_dict()
+        self.tenure_counts = df['Tenure'].value_counts().to_dict()
+        self._build()
+
+    def _build(self):
+        self.tree = {}
+        for (operator, entity, country, city), count in self.counts.items():
+            if count > 0:
+                self.tree.setdefault(operator, {}).setdefault(entity, {}).setdefault(country, set()).add(city)
+        self.tenures = ['All'] + sorted(tenure for tenure, count in self.tenure_counts.items() if count > 0)
+        self._options = {}
+
+    def upserted(self, removed, added):
+        """New hierarchy with the store rows ``removed`` taken out and ``added`` put in."""
+        updated = copy.copy(self)
+        updated.counts = dict(self.counts)
+        updated.tenure_counts = dict(self.tenure_counts)
+        for rows, sign in [(removed, -1), (added, 1)]:
+            for combination, count in rows.groupby(FACET_COLUMNS, observed=True).size().items():
+                updated.counts[combination] = updated.counts.get(combination, 0) + sign * count
+            for tenure, count in rows['Tenure'].value_counts().items():
+                updated.tenure_counts[tenure] = updated.tenure_counts.get(tenure, 0) + sign * count
+        updated._build()
+        return updated
+
+    def options(self, *selections):
+        """Radio options for the level below the given selections ('All' matches any)."""
+        options = self._options.get(selections)
+        if options is None:
+            nodes = [self.tree]
+            for selected in selections:
+                nodes = [child for node in nodes for value, child in node.items()
+                         if selected == 'All' or value == selected]
+            values = set()
+            for node in nodes:
+                values.update(node)
+            options = self._options[selections] = ['All'] + sorted(values)
+        return options
+
+
+class FilterEngine:
+    """Row-id indexes over a store DataFrame, built once per upload.
+
+    Categorical columns map each value to the sorted positions holding it and
+    range columns keep their values pre-sorted, so a filter selection is one
+    intersection of row-id arrays followed by a single ``take``.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.n_rows = len(df)
+        self.facets = FacetHierarchy(df)
+        self.categorical_index = {
+            col: df.groupby(col, sort=False, observed=True).indices
+            for col in CATEGORICAL_FILTER_COLUMNS
+        }
+        self.range_index = {
+            col: RangeIndex(df[col].to_numpy(dtype='float64', na_value=np.nan))
+            for col in RANGE_FILTER_COLUMNS
+        }
+
+    def row_ids(self, equals=None, ranges=None):
+        """Sorted row positions matching every equality and range condition."""
+        selections = []
+        for col, value in (equals or {}).items():
+            selections.append(self.categorical_index[col].get(value, EMPTY_ROW_IDS))
+        for col, (low, high) in (ranges or {}).items():
+            ids = self.range_index[col].select(low, high)
+            if ids is not None:
+                selections.append(ids)
+
+        if not selections:
+            return np.arange(self.n_rows)
+
+        # Start from the smallest candidate set and keep only ids that every
+        # other condition also marks
+        selections.sort(key=len)
+        result = selections[0]
+        for ids in selections[1:]:
+            if len(result) == 0:
+                break
+            keep = np.zeros(self.n_rows, dtype=bool)
+            keep[ids] = True
+            result = result[keep[result]]
+        return np.sort(result)
+
+    def upserted(self, df, changed_ids, old_rows, new_ids):
+        """Engine over ``df``, the indexed frame after an upsert.
+
+        ``changed_ids`` are the sorted positions whose values changed (their
+        previous values are ``old_rows``) and ``new_ids`` the sorted positions
+        of all changed and appended rows in ``df``. Only the index entries of
+        those rows are touched.
+        """
+        new_rows = df.take(new_ids)
+        updated = copy.copy(self)
+        updated.df = df
+        updated.n_rows = len(df)
+        updated.facets = self.facets.upserted(old_rows, new_rows)
+
+        updated.categorical_index = {}
+        for col, index in self.categorical_index.items():
+            index = dict(index)
+            # Id arrays stay sorted: removed ids are deleted at their
+            # positions and added ids inserted at theirs
+            for value, at in old_rows.groupby(col, sort=False, observed=True).indices.items():
+                ids = index[value]
+                remaining = np.delete(ids, np.searchsorted(ids, changed_ids[at]))
+                if len(remaining):
+                    index[value] = remaining
+                else:
+                    del index[value]
+            for value, at in new_rows.groupby(col, sort=False, observed=True).indices.items():
+                ids = index.get(value, EMPTY_ROW_IDS)
+                index[value] = np.insert(ids, np.searchsorted(ids, new_ids[at]), new_ids[at])
+            updated.categorical_index[col] = index
+
+        updated.range_index = {
+            col: index.upserted(changed_ids, new_ids,
+                                new_rows[col].to_numpy(dtype='float64', na_value=np.nan), len(df))
+            for col, index in self.range_index.items()
+        }
+        return updated
+
+    def ranges_narrow(self, ranges=None):
+        """True if the range conditions select other rows than the full slider bounds.
+
+        At the full bounds a selection holds every row without a missing
+        range value, the rows RollupCube is built over. A slider moved inside
+        its column's bounds, or a column left out of ``ranges`` that has
+        missing values, makes the selection differ from that.
+        """
+        ranges = ranges or {}
+        for col, index in self.range_index.items():
+            if col not in ranges:
+                if index.has_missing:
+                    return True
+                continue
+            bounds = index.bounds
+            low, high = ranges[col]
+            if bounds is not None and (low > bounds[0] or high < bounds[1]):
+                return True
+        return False
+
+    def select(self, equals=None, ranges=None):
+        """Rows of the indexed DataFrame matching the given conditions."""
+        return self.df.take(self.row_ids(equals, ranges))
+
+
+def filter_signature(equals=None, ranges=None, near=None):
+    """Hashable key identifying a filter selection, for caching derived results."""
+    return (
+        tuple(sorted((equals or {}).items())),
+        tuple(sorted((col, tuple(bounds)) for col, bounds in (ranges or {}).items())),
+        tuple(sorted((near or {}).items())),
+    )
@@ -0,0 +1,292 @@
+import folium
+from folium.plugins import FastMarkerCluster, HeatMap
+from folium.utilities import JsCode
+import numpy as np
+
+from caching import BoundedCache
+from spatial_index import bin_cell_size, bin_stores, estimate_view_bounds, expand_bounds, normalize_bounds
+
+
+# Above this many stores the map switches from individual pins to a single
+# clustered layer
+HIGH_VOLUME_MARKER_THRESHOLD = 2000
+
+# With aggregation on, stores are drawn as grid cells below this zoom level
+AGGREGATE_BELOW_ZOOM = 10
+
+# Viewport mode also draws stores within this fraction of the view size
+# around the visible area, so small pans do not show empty edges
+VIEWPORT_MARGIN = 0.25
+
+# Layers of the view-dependent modes are cached per session under a memory
+# bound, large enough for a clustered layer of about 250k stores. Entries are
+# charged the memory a built layer takes per store (clustered or as single
+# markers) or per aggregated cell, as measured with tracemalloc
+MAP_LAYER_CACHE_MAX_BYTES = 128 * 1024 ** 2
+CLUSTERED_STORE_BYTES = 544
+INDIVIDUAL_STORE_BYTES = 1152
+BIN_CELL_BYTES = 1536
+
+# Marker colours keyed by the sign of percentage_value_change (-1, 0, +1),
+# matching the red/gray/green folium.Icon palette used for individual markers
+SIGN_COLOURS = {-1: '#d63e2a', 0: '#575757', 1: '#72b026'}
+
+# Density layer weights offered in the map options (None weighs every store 1).
+# Signed weights are drawn as separate layers for positive and negative values
+HEATMAP_WEIGHTS = {
+    'Value change': 'absolute_value_change',
+    '2025 value': 'value_2025',
+    'Store count': None,
+}
+SIGNED_HEATMAP_WEIGHTS = {'absolute_value_change'}
+HEATMAP_GRADIENTS = {
+    1: {0.4: '#c7e9c0', 0.7: '#41ab5d', 1.0: '#00441b'},
+    -1: {0.4: '#fcbba1', 0.7: '#ef3b2c', 1.0: '#67000d'},
+}
+HEATMAP_LAYER_NAMES = {1: 'Increase', -1: 'Decrease'}
+# Weights are scaled to 0-1 by this percentile of their magnitude, so a few
+# very large stores do not wash out everything else
+HEATMAP_SCALE_PERCENTILE = 99
+
+# Popup fields sent per store, under short keys to keep the map payload small
+POPUP_KEYS = ['n', 'o', 'e', 'v24', 'v25', 'd', 'p']
+
+# Shared client-side popup template. Popup HTML is only built in the browser
+# when a popup is opened, instead of being pre-rendered for every store.
+STORE_POPUP_TEMPLATE = """
+function (p) {
+    function number(value) { return value === null ? '' : Number(value).toLocaleString('en-US'); }
+    return '<div style="width: 250px;">'
+        + '<h4>' + p.n + '</h4>'
+        + '<p><strong>Operator:</strong> ' + p.o + '</p>'
+        + '<p><strong>Entity:</strong> ' + p.e + '</p>'
+        + '<p><strong>Value 2024:</strong> ' + number(p.v24) + '</p>'
+        + '<p><strong>Value 2025:</strong> ' + number(p.v25) + '</p>'
+        + '<p><strong>Absolute Change:</strong> ' + number(p.d) + '</p>'
+        + '<p><strong>Percentage Change:</strong> ' + (p.p === null ? 'nan' : p.p.toFixed(2)) + '%</p>'
+        + '</div>';
+}
+"""
+
+# Binds the tooltip and lazy popup to each store of a GeoJSON layer
+STORE_FEATURE_CALLBACK = """
+function (feature, layer) {
+    var popupHtml = %s;
+    layer.bindTooltip(feature.properties.n);
+    layer.bindPopup(function () { return popupHtml(feature.properties); }, {maxWidth: 300});
+}
+""" % STORE_POPUP_TEMPLATE
+
+# Client-side marker factory for the clustered layer; each row is
+# [latitude, longitude, sign] followed by the POPUP_KEYS values
+CLUSTER_MARKER_CALLBACK = """
+function (row) {
+    var popupHtml = %s;
+    var colours = {"-1": "%s", "0": "%s", "1": "%s"};
+    var colour = colours[row[2]];
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 6, color: colour, fillColor: colour, fillOpacity: 0.8, weight: 1
+    });
+    var p = {n: row[3], o: row[4], e: row[5], v24: row[6], v25: row[7], d: row[8], p: row[9]};
+    marker.bindTooltip(p.n);
+    marker.bindPopup(function () { return popupHtml(p); }, {maxWidth: 300});
+    return marker;
+}
+""" % (STORE_POPUP_TEMPLATE, SIGN_COLOURS[-1], SIGN_COLOURS[0], SIGN_COLOURS[1])
+
+# folium.Icon colour for individual pins, by sign of percentage change
+SIGN_ICON_COLOURS = {-1: 'red', 0: 'gray', 1: 'green'}
+
+
+def is_high_volume(stores):
+    """Return True when the store set should use the clustered layer."""
+    return len(stores) > HIGH_VOLUME_MARKER_THRESHOLD
+
+
+def change_signs(stores):
+    """Sign of percentage_value_change per store, with missing values as 0."""
+    return np.sign(stores['percentage_value_change'].fillna(0).to_numpy()).astype('int8')
+
+
+def new_layer_cache():
+    """Session cache of (layer, estimated bytes) entries built by the layer functions below."""
+    return BoundedCache(MAP_LAYER_CACHE_MAX_BYTES, sizeof=lambda entry: entry[1])
+
+
+def store_layer(stores):
+    """Feature group drawing the stores and its estimated memory, for the layer cache."""
+    layer = folium.FeatureGroup(name='Stores')
+    add_store_markers(layer, stores)
+    store_bytes = CLUSTERED_STORE_BYTES if is_high_volume(stores) else INDIVIDUAL_STORE_BYTES
+    return layer, len(stores) * store_bytes
+
+
+def bin_layer(bins):
+    """Feature group drawing aggregated cells and its estimated memory, for the layer cache."""
+    layer = folium.FeatureGroup(name='Stores')
+    add_bin_layer(layer, bins)
+    return layer, len(bins) * BIN_CELL_BYTES
+
+
+def heatmap_layer(points, signed):
+    """Feature group with one density layer per weight sign."""
+    layer = folium.FeatureGroup(name='Stores')
+    for sign, data in points.items():
+        HeatMap(
+            data,
+            name=HEATMAP_LAYER_NAMES[sign],
+            radius=18,
+            blur=15,
+            gradient=HEATMAP_GRADIENTS[sign] if signed else None,
+            control=False,
+        ).add_to(layer)
+    return layer
+
+
+def add_store_markers(m, stores):
+    """Add the stores to the map, choosing the rendering mode by row count."""
+    if is_high_volume(stores):
+        add_clustered_store_layer(m, stores)
+    else:
+        add_individual_store_markers(m, stores)
+
+
+def popup_columns(stores):
+    """Popup field values per store, one list per POPUP_KEYS entry."""
+    pct = stores['percentage_value_change'].round(2)
+    return [
+        stores['storename'].astype(str).tolist(),
+        stores['operator_name'].astype(str).tolist(),
+        stores['entity'].astype(str).tolist(),
+        stores['value_2024'].tolist(),
+        stores['value_2025'].tolist(),
+        stores['absolute_value_change'].tolist(),
+        pct.astype(object).where(pct.notna(), None).tolist(),
+    ]
+
+
+def add_individual_store_markers(m, stores):
+    """Add one pin per store, as a GeoJSON layer per marker colour."""
+    signs = change_signs(stores)
+    for sign, icon_colour in SIGN_ICON_COLOURS.items():
+        group = stores[signs == sign]
+        if len(group) == 0:
+            continue
+        features = [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                'properties': dict(zip(POPUP_KEYS, values)),
+            }
+            for lat, lon, *values in zip(
+                group['latitude'].tolist(), group['longitude'].tolist(), *popup_columns(group)
+            )
+        ]
+        folium.GeoJson(
+            {'type': 'FeatureCollection', 'features': features},
+            marker=folium.Marker(icon=folium.Icon(color=icon_colour, icon_color='white', icon='info-sign')),
+            on_each_feature=JsCode(STORE_FEATURE_CALLBACK),
+            control=False,
+        ).add_to(m)
+
+
+def add_clustered_store_layer(m, stores):
+    """Add all stores as one FastMarkerCluster layer built column-wise."""
+    data = list(zip(
+        stores['latitude'].tolist(),
+        stores['longitude'].tolist(),
+        change_signs(stores).tolist(),
+        *popup_columns(stores),
+    ))
+    FastMarkerCluster(data, callback=CLUSTER_MARKER_CALLBACK, name='Stores').add_to(m)
+
+
+def viewport_query_bounds(map_state, center_lat, center_lon, zoom_start):
+    """Bounding box to draw stores in, from the st_folium state of the map.
+
+    Falls back to an estimate from the map's starting centre and zoom until
+    the browser has reported the real bounds.
+    """
+    bounds = (map_state or {}).get('bounds') or {}
+    south_west, north_east = bounds.get('_southWest') or {}, bounds.get('_northEast') or {}
+    if None in (south_west.get('lat'), south_west.get('lng'), north_east.get('lat'), north_east.get('lng')):
+        view = estimate_view_bounds(center_lat, center_lon, zoom_start)
+    else:
+        view = (south_west['lat'], south_west['lng'], north_east['lat'], north_east['lng'])
+    return normalize_bounds(*expand_bounds(*view, VIEWPORT_MARGIN))
+
+
+def map_zoom(map_state, zoom_start):
+    """Current zoom level from the st_folium state, or the starting zoom."""
+    zoom = (map_state or {}).get('zoom')
+    return zoom_start if zoom is None else int(zoom)
+
+
+def aggregate_stores(stores, zoom):
+    """Grid cells summarising the stores, sized for the zoom level."""
+    return bin_stores(stores, bin_cell_size(zoom))
+
+
+def heatmap_points(stores, weight_column=None):
+    """[lat, lon, weight] arrays for the density layers, keyed by weight sign.
+
+    Weights are scaled together so both layers share one intensity scale;
+    negative weights go to the -1 layer as magnitudes. Stores with zero
+    weight are left out.
+    """
+    latitude = stores['latitude'].to_numpy(dtype='float64')
+    longitude = stores['longitude'].to_numpy(dtype='float64')
+    if weight_column is None:
+        weights = np.ones(len(stores))
+    else:
+        weights = stores[weight_column].to_numpy(dtype='float64', na_value=0)
+
+    scale = np.percentile(np.abs(weights), HEATMAP_SCALE_PERCENTILE) if len(weights) else 0
+    if scale > 0:
+        weights = np.clip(weights / scale, -1, 1)
+    points = {}
+    for sign in (1, -1):
+        keep = np.sign(weights) == sign
+        if keep.any():
+            points[sign] = np.column_stack([latitude[keep], longitude[keep], np.abs(weights[keep])]).round(5)
+    return points
+
+
+def add_bin_layer(parent, bins):
+    """Add aggregated cells as one GeoJSON layer coloured by net value change."""
+    signs = np.sign(bins['absolute_value_change'].to_numpy()).astype('int8')
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [[[west, south], [east, south], [east, north], [west, north], [west, south]]],
+            },
+            'properties': {
+                'colour': SIGN_COLOURS[sign],
+                'stores': f"{stores:,}",
+                'value_2024': f"{value_2024:,}",
+                'value_2025': f"{value_2025:,}",
+                'absolute_value_change': f"{change:+,}",
+            },
+        }
+        for south, west, north, east, stores, value_2024, value_2025, change, sign in zip(
+            bins['south'].tolist(), bins['west'].tolist(), bins['north'].tolist(), bins['east'].tolist(),
+            bins['stores'].tolist(), bins['value_2024'].tolist(), bins['value_2025'].tolist(),
+            bins['absolute_value_change'].tolist(), signs.tolist(),
+        )
+    ]
+    folium.GeoJson(
+        {'type': 'FeatureCollection', 'features': features},
+        name='Store areas',
+        style_function=lambda feature: {
+            'color': feature['properties']['colour'],
+            'fillColor': feature['properties']['colour'],
+            'weight': 1,
+            'fillOpacity': 0.45,
+        },
+        tooltip=folium.GeoJsonTooltip(
+            fields=['stores', 'value_2024', 'value_2025', 'absolute_value_change'],
+            aliases=['Stores', '2024 Value', '2025 Value', 'Change in value'],
+        ),
+    ).add_to(parent)
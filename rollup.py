@@ -0,0 +1,87 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from filter_engine import CATEGORICAL_FILTER_COLUMNS, RANGE_FILTER_COLUMNS
+
+
+ROLLUP_DIMENSIONS = CATEGORICAL_FILTER_COLUMNS
+ROLLUP_MEASURES = ['value_2024', 'absolute_value_change', 'value_2025']
+BREAKDOWN_COLUMNS = ['stores'] + ROLLUP_MEASURES
+
+
+class RollupCube:
+    """Store counts and value sums per combination of the categorical filter columns.
+
+    Built once per dataset. Totals and breakdowns for any selection made only
+    with the categorical filters are read from the cube, whose size depends on
+    the number of distinct combinations rather than the number of stores.
+    Stores with a missing range filter value are left out, as the range
+    sliders leave them out even at their full bounds.
+    """
+
+    def __init__(self, df):
+        self.cells = _cells(df).reset_index()
+        self._totals = {}
+
+    def upserted(self, removed, added):
+        """New cube with the store rows ``removed`` subtracted and ``added`` added.
+
+        Only the given rows are grouped; they are combined with the existing
+        cells, whose number is independent of the number of stores.
+        """
+        removed_cells = -_cells(removed)
+        combined = pd.concat([self.cells.set_index(ROLLUP_DIMENSIONS), removed_cells, _cells(added)])
+        cells = combined.groupby(level=ROLLUP_DIMENSIONS, observed=True, dropna=False, sort=False).sum()
+        updated = copy.copy(self)
+        updated.cells = cells[cells['stores'] > 0].reset_index()
+        updated._totals = {}
+        return updated
+
+    def _matching_cells(self, equals):
+        mask = np.ones(len(self.cells), dtype=bool)
+        for col, value in (equals or {}).items():
+            mask &= (self.cells[col] == value).to_numpy()
+        return self.cells[mask]
+
+    def totals(self, equals=None):
+        """Store count and measure sums for a categorical selection (memoized)."""
+        key = tuple(sorted((equals or {}).items()))
+        totals = self._totals.get(key)
+        if totals is None:
+            totals = self._totals[key] = summarize(self._matching_cells(equals), counts='stores')
+        return totals
+
+    def breakdown(self, by, equals=None):
+        """Per-value totals of column ``by`` for a categorical selection."""
+        cells = self._matching_cells(equals)
+        return _sorted_breakdown(cells.groupby(by, observed=True)[BREAKDOWN_COLUMNS].sum())
+
+
+def _cells(df):
+    df = df[df[RANGE_FILTER_COLUMNS].notna().all(axis=1).to_numpy()]
+    grouped = df.groupby(ROLLUP_DIMENSIONS, observed=True, dropna=False, sort=False)
+    cells = grouped[ROLLUP_MEASURES].sum()
+    cells['stores'] = grouped.size()
+    return cells
+
+
+def summarize(frame, counts=None):
+    """Totals as plain ints: rows (or the sum of column ``counts``) and measure sums."""
+    totals = {'stores': int(frame[counts].sum()) if counts else len(frame)}
+    for col in ROLLUP_MEASURES:
+        totals[col] = int(frame[col].sum())
+    return totals
+
+
+def scan_breakdown(frame, by):
+    """Per-value totals of column ``by``, computed from store rows."""
+    grouped = frame.groupby(by, observed=True)
+    breakdown = grouped[ROLLUP_MEASURES].sum()
+    breakdown.insert(0, 'stores', grouped.size())
+    return _sorted_breakdown(breakdown)
+
+
+def _sorted_breakdown(breakdown):
+    return breakdown[BREAKDOWN_COLUMNS].astype('int64').sort_values('value_2025', ascending=False)
@@ -0,0 +1,263 @@
+import copy
+import math
+
+import numpy as np
+import pandas as pd
+
+
+EMPTY_ROW_IDS = np.empty(0, dtype=np.int64)
+
+# Rendered map size assumed before the browser has reported its real bounds
+DEFAULT_VIEW_WIDTH_PX = 1000
+DEFAULT_VIEW_HEIGHT_PX = 500
+
+# Aggregated cells are about this many pixels across at the zoom they are drawn for
+BIN_SIZE_PX = 48
+BIN_SUM_COLUMNS = ['value_2024', 'value_2025', 'absolute_value_change']
+
+# Mean Earth radius used for great-circle distances
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+MAX_DISTANCE_KM = EARTH_RADIUS_KM * math.pi
+
+
+class GridIndex:
+    """Uniform lat/lon grid over the store locations, built once per dataset.
+
+    Row ids are stored grouped by cell, row-major, so every grid row of a
+    bounding-box query is a single contiguous slice and a query costs time
+    proportional to the stores near the box rather than to the dataset.
+    """
+
+    def __init__(self, latitude, longitude, stores_per_cell=16):
+        self.latitude = np.asarray(latitude, dtype='float64')
+        self.longitude = np.asarray(longitude, dtype='float64')
+        n = len(self.latitude)
+        if n == 0:
+            self.lat_min = self.lon_min = 0.0
+            self.cell_size = 1.0
+            self.n_grid_rows = self.n_grid_cols = 1
+            self.row_ids = EMPTY_ROW_IDS
+            self.sorted_cells = EMPTY_ROW_IDS
+            self.cell_starts = np.zeros(2, dtype=np.int64)
+            return
+
+        self.lat_min, self.lon_min = self.latitude.min(), self.longitude.min()
+        lat_span = self.latitude.max() - self.lat_min
+        lon_span = self.longitude.max() - self.lon_min
+        cells_per_side = int(np.clip(math.sqrt(n / stores_per_cell), 1, 1024))
+        self.cell_size = max(lat_span, lon_span, 1e-6) / cells_per_side
+        self.n_grid_rows = int(lat_span / self.cell_size) + 1
+        self.n_grid_cols = int(lon_span / self.cell_size) + 1
+
+        cells = self._cell_rows(self.latitude) * self.n_grid_cols + self._cell_cols(self.longitude)
+        self.row_ids = np.argsort(cells, kind='stable')
+        self.sorted_cells = cells[self.row_ids]
+        self._index_cells()
+
+    def _index_cells(self):
+        n_cells = self.n_grid_rows * self.n_grid_cols
+        self.cell_starts = np.searchsorted(self.sorted_cells, np.arange(n_cells + 1))
+
+    def upserted(self, ids, latitude, longitude):
+        """New index with rows ``ids`` (existing or appended) at the given locations.
+
+        The grid keeps its extent; stores outside it fall into the edge cells,
+        which queries clip to as well, so results stay exact.
+        """
+        ids = np.asarray(ids)
+        n_rows = max(len(self.latitude), int(ids.max()) + 1) if len(ids) else len(self.latitude)
+        updated = copy.copy(self)
+        updated.latitude = np.concatenate([self.latitude, np.full(n_rows - len(self.latitude), np.nan)])
+        updated.longitude = np.concatenate([self.longitude, np.full(n_rows - len(self.longitude), np.nan)])
+        updated.latitude[ids] = latitude
+        updated.longitude[ids] = longitude
+
+        moved = np.zeros(n_rows, dtype=bool)
+        moved[ids] = True
+        keep = ~moved[self.row_ids]
+        cells = self._cell_rows(latitude) * self.n_grid_cols + self._cell_cols(longitude)
+        order = np.argsort(cells, kind='stable')
+        sorted_cells = self.sorted_cells[keep]
+        at = np.searchsorted(sorted_cells, cells[order], side='right')
+        updated.row_ids = np.insert(self.row_ids[keep], at, ids[order])
+        updated.sorted_cells = np.insert(sorted_cells, at, cells[order])
+        updated._index_cells()
+        return updated
+
+    def _cell_rows(self, latitude):
+        rows = np.floor((np.asarray(latitude) - self.lat_min) / self.cell_size)
+        return np.clip(rows, 0, self.n_grid_rows - 1).astype(np.int64)
+
+    def _cell_cols(self, longitude):
+        cols = np.floor((np.asarray(longitude) - self.lon_min) / self.cell_size)
+        return np.clip(cols, 0, self.n_grid_cols - 1).astype(np.int64)
+
+    def query(self, south, west, north, east):
+        """Sorted row ids of stores inside the bounding box.
+
+        ``west`` may be greater than ``east`` for boxes crossing the antimeridian.
+        """
+        if west > east:
+            return np.union1d(self.query(south, west, north, 180.0),
+                              self.query(south, -180.0, north, east))
+        if len(self.row_ids) == 0 or south > north:
+            return EMPTY_ROW_IDS
+
+        row_start, row_stop = self._cell_rows([south, north])
+        col_start, col_stop = self._cell_cols([west, east])
+        chunks = []
+        for grid_row in range(row_start, row_stop + 1):
+            first_cell = grid_row * self.n_grid_cols + col_start
+            last_cell = grid_row * self.n_grid_cols + col_stop
+            chunks.append(self.row_ids[self.cell_starts[first_cell]:self.cell_starts[last_cell + 1]])
+        ids = np.concatenate(chunks)
+
+        # Cells on the edge of the box are only partly inside it
+        lat, lon = self.latitude[ids], self.longitude[ids]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(ids[inside])
+
+    def within_radius(self, lat, lon, radius_km, within=None):
+        """Sorted row ids of stores within ``radius_km`` of a point, and their distances.
+
+        The grid narrows the search to the bounding box of the circle; only
+        stores in it get an exact haversine distance. If given, results are
+        limited to the sorted row ids ``within``.
+        """
+        ids = self.query(*radius_bounds(lat, lon, radius_km))
+        if within is not None:
+            ids = ids[in_sorted(ids, within)]
+        distances = haversine_km(lat, lon, self.latitude[ids], self.longitude[ids])
+        inside = distances <= radius_km
+        return ids[inside], distances[inside]
+
+    def nearest(self, lat, lon, k, within=None, exclude=None):
+        """Row ids of the ``k`` stores closest to a point, nearest first, and their distances.
+
+        Searches circles of doubling radius until one holds ``k`` candidates,
+        so the cost depends on how far the k-th store is rather than on the
+        dataset. ``within`` limits candidates as in within_radius(); the row
+        id ``exclude`` (e.g. the store the search starts from) is skipped.
+        """
+        radius_km = max(self.cell_size * KM_PER_DEGREE, 1.0)
+        while True:
+            ids, distances = self.within_radius(lat, lon, radius_km, within)
+            if exclude is not None:
+                keep = ids != exclude
+                ids, distances = ids[keep], distances[keep]
+            if len(ids) >= k or radius_km >= MAX_DISTANCE_KM:
+                break
+            radius_km = min(radius_km * 2, MAX_DISTANCE_KM)
+        order = np.argsort(distances, kind='stable')[:k]
+        return ids[order], distances[order]
+
+
+def normalize_bounds(south, west, north, east):
+    """Clamp latitudes and wrap longitudes of a Leaflet view into [-180, 180]."""
+    south, north = max(south, -90.0), min(north, 90.0)
+    if east - west >= 360:
+        return south, -180.0, north, 180.0
+    west = (west + 180.0) % 360.0 - 180.0
+    east = (east + 180.0) % 360.0 - 180.0
+    return south, west, north, east
+
+
+def expand_bounds(south, west, north, east, margin):
+    """Grow a bounding box by ``margin`` times its size on every side."""
+    lat_pad = (north - south) * margin
+    lon_pad = ((east - west) % 360 or 360) * margin
+    return south - lat_pad, west - lon_pad, north + lat_pad, east + lon_pad
+
+
+def estimate_view_bounds(center_lat, center_lon, zoom,
+                         width_px=DEFAULT_VIEW_WIDTH_PX, height_px=DEFAULT_VIEW_HEIGHT_PX):
+    """Approximate the bounds Leaflet shows for a centre and zoom level."""
+    # Web Mercator: 256 px tiles cover 360 degrees of longitude at zoom 0
+    degrees_per_px = 360.0 / (256 * 2 ** zoom)
+    half_width = width_px / 2 * degrees_per_px
+    half_height = height_px / 2 * degrees_per_px * math.cos(math.radians(center_lat))
+    return (center_lat - half_height, center_lon - half_width,
+            center_lat + half_height, center_lon + half_width)
+
+
+def radius_bounds(lat, lon, radius_km):
+    """Bounding box of the circle of ``radius_km`` around a point, for GridIndex.query()."""
+    lat_pad = radius_km / KM_PER_DEGREE
+    south, north = lat - lat_pad, lat + lat_pad
+    # Widest longitude offset of the circle; a circle reaching a pole spans
+    # every longitude
+    ratio = math.sin(math.radians(min(lat_pad, 90.0))) / max(math.cos(math.radians(lat)), 1e-12)
+    if south <= -90 or north >= 90 or ratio >= 1:
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    lon_pad = math.degrees(math.asin(ratio))
+    return normalize_bounds(south, lon - lon_pad, north, lon + lon_pad)
+
+
+def haversine_km(lat, lon, latitudes, longitudes):
+    """Great-circle distances in km from one point to arrays of points."""
+    lat1, lat2 = math.radians(lat), np.radians(latitudes)
+    half_dlat = (lat2 - lat1) / 2
+    half_dlon = np.radians(np.asarray(longitudes) - lon) / 2
+    a = np.sin(half_dlat) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def in_sorted(ids, within):
+    """Boolean mask of the elements of ``ids`` that occur in sorted ``within``."""
+    if len(ids) == 0 or len(within) == 0:
+        return np.zeros(len(ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(within, ids), len(within) - 1)
+    return within[positions] == ids
+
+
+def intersect_sorted(ids, within):
+    """Elements of sorted ``ids`` that also occur in sorted ``within``.
+
+    Costs O(len(ids) * log(len(within))), so small viewports stay cheap even
+    when ``within`` is a large filter selection.
+    """
+    if len(ids) == 0 or len(within) == 0:
+        return EMPTY_ROW_IDS
+    return ids[in_sorted(ids, within)]
+
+
+def bin_cell_size(zoom):
+    """Side in degrees of an aggregation cell drawn at the given zoom level."""
+    return BIN_SIZE_PX * 360.0 / (256 * 2 ** zoom)
+
+
+def bin_stores(stores, cell_size):
+    """Aggregate stores into square lat/lon cells of ``cell_size`` degrees.
+
+    Returns one row per non-empty cell with its bounds, the mean store
+    location, the store count and the sums of BIN_SUM_COLUMNS.
+    """
+    latitude = stores['latitude'].to_numpy(dtype='float64')
+    longitude = stores['longitude'].to_numpy(dtype='float64')
+    if len(latitude) == 0:
+        return pd.DataFrame(columns=['south', 'west', 'north', 'east', 'latitude', 'longitude', 'stores']
+                            + BIN_SUM_COLUMNS)
+
+    cell_rows = np.floor(latitude / cell_size).astype(np.int64)
+    cell_cols = np.floor(longitude / cell_size).astype(np.int64)
+    first_col = cell_cols.min()
+    n_cols = cell_cols.max() - first_col + 1
+    cell_keys, inverse = np.unique(cell_rows * n_cols + (cell_cols - first_col), return_inverse=True)
+    counts = np.bincount(inverse)
+
+    south = (cell_keys // n_cols) * cell_size
+    west = (cell_keys % n_cols + first_col) * cell_size
+    bins = pd.DataFrame({
+        'south': south,
+        'west': west,
+        'north': south + cell_size,
+        'east': west + cell_size,
+        'latitude': np.bincount(inverse, weights=latitude) / counts,
+        'longitude': np.bincount(inverse, weights=longitude) / counts,
+        'stores': counts,
+    })
+    for col in BIN_SUM_COLUMNS:
+        sums = np.bincount(inverse, weights=stores[col].to_numpy(dtype='float64', na_value=0))
+        bins[col] = np.round(sums).astype('int64')
+    return bins
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+
+# A row of an added file replaces the loaded store with the same values here
+STORE_KEY_COLUMNS = ['storename', 'operator_name', 'city']
+
+
+def store_keys(df):
+    """64-bit hash of each row's store key; category and text columns hash alike."""
+    return pd.Index(pd.util.hash_pandas_object(df[STORE_KEY_COLUMNS], index=False).to_numpy())
+
+
+def store_key_index(df, offset=0):
+    """Row position of every store key hash in ``df`` (the last row wins for repeated keys)."""
+    keys = store_keys(df)
+    positions = pd.Series(np.arange(offset, offset + len(df)), index=keys)
+    return positions[~keys.duplicated(keep='last')]
+
+
+def plan_upsert(df, key_index, delta):
+    """Match the rows of ``delta`` to the stores in ``df``.
+
+    Returns ``(positions, changed_rows, new_rows, unchanged)``: the sorted
+    positions of loaded stores whose values differ in ``delta`` with their
+    new rows in the same order, the rows of stores not loaded yet, and the
+    number of rows identical to what is loaded.
+    """
+    delta = delta[~delta.duplicated(STORE_KEY_COLUMNS, keep='last')]
+    matches = key_index.reindex(store_keys(delta)).to_numpy(dtype='float64', na_value=np.nan)
+    found = ~np.isnan(matches)
+    positions = matches[found].astype(np.int64)
+    # A hash match must also match on the key values; the rare collision is
+    # treated as a new store
+    same_key = np.ones(len(positions), dtype=bool)
+    for col in STORE_KEY_COLUMNS:
+        same_key &= df[col].take(positions).to_numpy(dtype=object) == delta[col][found].to_numpy(dtype=object)
+    found[found] = same_key
+    existing = delta[found]
+    positions = positions[same_key]
+
+    # Compare every shared column; missing values on both sides count as equal
+    differs = np.zeros(len(existing), dtype=bool)
+    for col in df.columns:
+        if col in existing.columns:
+            old = df[col].take(positions).to_numpy(dtype=object)
+            new = existing[col].to_numpy(dtype=object)
+            differs |= ~((old == new) | (pd.isna(old) & pd.isna(new)))
+
+    order = np.argsort(positions[differs], kind='stable')
+    changed_rows = existing[differs].iloc[order]
+    return positions[differs][order], changed_rows, delta[~found], int(len(existing) - differs.sum())
+
+
+def upsert_frame(df, positions, changed_rows, new_rows):
+    """``df`` with the rows at ``positions`` replaced and ``new_rows`` appended.
+
+    Untouched rows keep their positions, so row-id indexes over ``df`` stay
+    valid for them. Category columns gain any new values as categories, kept
+    in sorted order, and integer columns keep their (possibly downcast) type
+    when the new values fit it.
+    """
+    columns = {}
+    for col in df.columns:
+        changed = changed_rows[col] if col in changed_rows.columns else None
+        added = new_rows[col] if col in new_rows.columns else pd.Series(np.nan, index=range(len(new_rows)))
+        columns[col] = _upsert_column(df[col], positions, changed, added)
+    return pd.DataFrame(columns, copy=False)
+
+
+def _upsert_column(base, positions, changed, added):
+    if isinstance(base.dtype, pd.CategoricalDtype):
+        incoming = pd.concat([added] if changed is None else [changed, added]).dropna().unique()
+        categories = base.cat.categories
+        base_codes = base.cat.codes.to_numpy(dtype=np.int64)
+        new_categories = pd.Index(incoming).difference(categories)
+        if len(new_categories):
+            # Recode the loaded rows into the merged, sorted categories; the
+            # extra last entry keeps the code -1 of missing values
+            categories = categories.append(new_categories).sort_values()
+            recode = np.append(categories.get_indexer(base.cat.categories), -1)
+            base_codes = recode[base_codes]
+        codes = np.concatenate([base_codes, categories.get_indexer(added)])
+        if changed is not None:
+            codes[positions] = categories.get_indexer(changed)
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    # The common type of old and new values, e.g. a wider integer. Integers
+    # are only widened as far as the new values need, so a column downcast
+    # by compact_column_types() stays compact
+    incoming = [added] if changed is None else [added, changed]
+    dtype = pd.concat([part.iloc[:0] for part in [base] + incoming]).dtype
+    if all(pd.api.types.is_integer_dtype(part.dtype) for part in [base] + incoming):
+        dtype = np.result_type(base.dtype, *[pd.to_numeric(part, downcast='integer').dtype for part in incoming])
+    column = pd.concat([base, added], ignore_index=True).astype(dtype)
+    if changed is not None and len(positions):
+        column.iloc[positions] = changed.astype(dtype).to_numpy()
+    return column
@@ -0,0 +1,39 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+TABLE_PAGE_SIZES = [50, 100, 500, 1000]
+
+
+def sort_row_ids(df, row_ids, column, ascending=True):
+    """Row ids ordered by ``column``, with missing values last.
+
+    Only the selected rows are sorted. Category columns sort on the rank of
+    each row's category value, so the result does not depend on the order of
+    the categories.
+    """
+    values = df[column].take(row_ids)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        # The extra last rank is picked by the code -1 of missing values
+        ranks = np.full(len(categories) + 1, np.nan)
+        ranks[np.argsort(np.asarray(categories), kind='stable')] = np.arange(len(categories))
+        values = pd.Series(ranks[values.cat.codes.to_numpy()])
+    order = np.asarray(values.argsort(kind='stable'))
+    if not ascending:
+        # Reverse the non-missing part only, so missing values stay last
+        n_valid = int(values.notna().sum())
+        order = np.concatenate([order[:n_valid][::-1], order[n_valid:]])
+    return row_ids[order]
+
+
+def page_count(n_rows, page_size):
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def page_row_ids(row_ids, page, page_size):
+    """Row ids shown on a 1-based page of the table."""
+    start = (page - 1) * page_size
+    return row_ids[start:start + page_size]
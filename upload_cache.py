@@ -0,0 +1,72 @@
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+
+
+# Parsed, type-converted uploads are kept here as Parquet files named after a
+# hash of the uploaded bytes, so re-uploading the same export skips decoding,
+# validation and conversion, including across server restarts
+CACHE_DIR = Path(os.environ.get('STORE_DASHBOARD_CACHE_DIR', Path(__file__).parent / '.upload_cache'))
+CACHE_MAX_BYTES = int(os.environ.get('STORE_DASHBOARD_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
+# Bump when convert_column_types() changes so stale entries are not reused
+CACHE_FORMAT_VERSION = 1
+
+
+def upload_cache_key(raw, compact=False):
+    """Cache key for the uploaded file bytes and load mode."""
+    digest = hashlib.sha256(raw).hexdigest()
+    mode = 'compact' if compact else 'plain'
+    return f"v{CACHE_FORMAT_VERSION}-{mode}-{digest}"
+
+
+def _cache_path(key):
+    return CACHE_DIR / f"{key}.parquet"
+
+
+def load_cached_upload(key):
+    """Return the cached DataFrame for ``key``, or None on a miss."""
+    path = _cache_path(key)
+    try:
+        df = pd.read_parquet(path, memory_map=True)
+        # Mark as recently used for LRU eviction
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return df
+
+
+def save_cached_upload(key, df):
+    """Persist ``df`` under ``key`` and evict old entries beyond the size cap.
+
+    Caching is best effort: a read-only or full disk must not break uploads.
+    """
+    path = _cache_path(key)
+    tmp_path = path.with_suffix('.tmp')
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        evict_least_recently_used()
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+
+
+def evict_least_recently_used(max_bytes=CACHE_MAX_BYTES):
+    """Delete the least recently used entries until the cache fits ``max_bytes``."""
+    entries = []
+    for path in CACHE_DIR.glob('*.parquet'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size